@@ -1,14 +1,35 @@
-from flask import Flask
-from flask_graphql import GraphQLView
+import time
+# Import time is measured from here and reported at /stats
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, Response, request
 from flask_cors import CORS
 import graphene
+from graphql import GraphQLError
 from graphene_sqlalchemy import SQLAlchemyObjectType
-from sqlalchemy import create_engine, Column, Integer, String, Float, JSON
+from sqlalchemy import create_engine, event, func, Column, Integer, String, Float, JSON, Index
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
-import time
+import threading
 
 # Import async fire-and-forget operations
-from async_db import fire_and_forget_create, fire_and_forget_update
+from async_db import (async_db, WriteQueueFull, fire_and_forget_create, fire_and_forget_update,
+                      fire_and_forget_create_many, fire_and_forget_update_many)
+from search_index import ensure_search_index, apply_search
+from pagination import encode_cursor, paginate, sort_order
+from loaders import get_loader
+from projection import column_map, requested_columns
+from migrations import run_migrations
+from facets import (ensure_facets, read_facets, total_products, category_total,
+                    estimate_price_range, read_catalog_version, CATALOG_VERSION_QUERY,
+                    CatalogWatcher)
+from cache import LRUCache
+from id_index import ProductIdIndex
+from graphql_view import (ProductGraphQLView, CachedDocumentBackend,
+                          PERSISTED_QUERY_CACHE_SIZE)
+from executor import RootFieldPool, GRAPHQL_EXECUTOR, GRAPHQL_MAX_WORKERS
+from responses import json_encode, compress_response, compress_chunks, choose_encoding
+from export import export_products, EXPORT_FORMATS, EXPORT_CHUNK_SIZE, MAX_EXPORT_CHUNK_SIZE
+from product_types import ProductRecord
 
 # Basic Flask setup
 app = Flask(__name__)
@@ -19,6 +40,16 @@ CORS(app)
 import os
 DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///products.db')
 engine = create_engine(DATABASE_URL)
+
+if engine.dialect.name == 'sqlite':
+    @event.listens_for(engine, 'connect')
+    def configure_sqlite_connection(dbapi_connection, connection_record):
+        """WAL lets readers run alongside the async writer instead of blocking"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+        cursor.close()
+
 db_session = scoped_session(sessionmaker(bind=engine))
 
 # Use the modern declarative_base from sqlalchemy.orm
@@ -35,15 +66,303 @@ class Product(Base):
     description = Column(String(1000))
     category = Column(String(100))
     image = Column(String(500))
-    rating = Column(JSON)  # stores {"rate": float, "count": int}
+    rating = Column(JSON)  # legacy {"rate": float, "count": int}, kept in step with the columns below
+    rating_rate = Column(Float)
+    rating_count = Column(Integer)
+    # Upstream feed key and sha256 of the content last synced (catalog_sync.py)
+    external_id = Column(String(100))
+    content_hash = Column(String(64))
+    
+    __table_args__ = (
+        # Keyset pagination ordered by price walks this index
+        Index('ix_products_price_id', 'price', 'id'),
+        Index('ix_products_rating_rate_id', 'rating_rate', 'id'),
+        # Category browse: equality on category, then a range/sort on the rest
+        Index('ix_products_category_id', 'category', 'id'),
+        Index('ix_products_category_price_id', 'category', 'price', 'id'),
+        Index('ix_products_category_rating_rate_id', 'category', 'rating_rate', 'id'),
+        # One product per upstream id; API-created products have none
+        Index('ix_products_external_id', 'external_id', unique=True),
+    )
+
+# Full-text index for allProducts(search:); False means LIKE fallback.
+# Set by prepare_database()
+SEARCH_INDEX_ENABLED = False
+
+# Summary tables behind catalogFacets and totalCount, kept current by triggers.
+# Set by prepare_database()
+FACETS_ENABLED = False
+
+_prepare_lock = threading.Lock()
+_database_prepared = False
+
+def prepare_database():
+    """Create and migrate the schema and check derived tables, once per process"""
+    global SEARCH_INDEX_ENABLED, FACETS_ENABLED, _database_prepared
+    with _prepare_lock:
+        if _database_prepared:
+            return
+        Base.metadata.create_all(bind=engine)
+        # Add columns/indexes that create_all won't add to existing tables
+        run_migrations(engine, Base.metadata)
+        SEARCH_INDEX_ENABLED = ensure_search_index(engine)
+        FACETS_ENABLED = ensure_facets(engine)
+        if FACETS_ENABLED:
+            async_db.version_query = CATALOG_VERSION_QUERY
+        _database_prepared = True
+
+# Estimated counts stop counting search matches here
+ESTIMATE_COUNT_CAP = int(os.environ.get('ESTIMATE_COUNT_CAP', 10000))
+
+# Serialized products for product(productId); PRODUCT_CACHE_SIZE=0 disables it
+product_cache = LRUCache(
+    int(os.environ.get('PRODUCT_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('PRODUCT_CACHE_TTL', 300))
+)
+
+# allProducts results keyed on normalized arguments and the data versions,
+# bounded by the total number of product rows held (empty results count as one)
+listing_cache = LRUCache(
+    int(os.environ.get('LISTING_CACHE_ROWS', 50000)),
+    ttl=float(os.environ.get('LISTING_CACHE_TTL', 60)),
+    weigh=lambda rows: max(1, len(rows))
+)
+
+# Ids of existing products, so updates can reject unknown ids without a query
+# (loaded by create_app)
+product_id_index = ProductIdIndex()
+
+# Shared catalog version (facets.py) this process's caches reflect; None
+# until the watcher's first read, and without the trigger-maintained counter
+_catalog_lock = threading.Lock()
+_seen_catalog_version = None
+_seen_delete_version = None
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+def catalog_changed(version, delete_version):
+    """Clear the caches if another process (worker, catalog sync, import)
+    changed products, and rebuild the id index if it deleted any; called
+    from the catalog watcher's thread
+    """
+    global _seen_catalog_version, _seen_delete_version
+    with _catalog_lock:
+        if _seen_catalog_version is not None and version > _seen_catalog_version:
+            product_cache.clear()
+            listing_cache.clear()
+        if _seen_catalog_version is None or version > _seen_catalog_version:
+            _seen_catalog_version = version
+        deleted = _seen_delete_version is not None and delete_version > _seen_delete_version
+        _seen_delete_version = delete_version
+    if deleted:
+        product_id_index.rewarm(engine, Product.__table__)
+
+# Polled off the request path; foreign writes show up in the caches within
+# CATALOG_VERSION_POLL_MS
+catalog_watcher = CatalogWatcher(
+    engine, float(os.environ.get('CATALOG_VERSION_POLL_MS', 100)), catalog_changed
+)
+
+def note_own_commit(versions):
+    """Our own commits invalidate per id, so only step the seen version past them"""
+    global _seen_catalog_version
+    if versions is None:
+        return
+    before, after = versions
+    with _catalog_lock:
+        if _seen_catalog_version == before:
+            _seen_catalog_version = after
+
+# Writes invalidate once they are committed, not when queued
+async_db.add_commit_listener(
+    lambda product_ids, created_ids, versions: product_cache.invalidate_many(product_ids))
+# Listings are keyed on the data version; clearing just frees the stale ones
+async_db.add_commit_listener(lambda product_ids, created_ids, versions: listing_cache.clear())
+async_db.add_commit_listener(
+    lambda product_ids, created_ids, versions: product_id_index.add_many(created_ids))
+async_db.add_commit_listener(lambda product_ids, created_ids, versions: note_own_commit(versions))
+
+def commit_products(products):
+    """Commit newly added products; returns the catalog versions around the commit"""
+    db_session.flush()
+    versions = None
+    if FACETS_ENABLED:
+        after = read_catalog_version(db_session)
+        versions = (after - len(products), after)
+    db_session.commit()
+    ids = {product.id for product in products}
+    async_db.mark_committed(ids, ids, versions)
+    return ids
+
+def cache_product(product):
+    """Write a freshly committed product through to the product cache"""
+    product_cache.put(product.id, ProductRecord.from_model(product).to_dict())
+
+def missing_product_ids(product_ids):
+    """Ids with no product; only ids the index doesn't know hit the database"""
+    unknown = {product_id for product_id in product_ids if product_id not in product_id_index}
+    if not unknown:
+        return set()
+    found = {
+        row.id for row in
+        db_session.query(Product.id).filter(Product.id.in_(unknown))
+    }
+    # Created by another process (import, sync) since startup
+    product_id_index.add_many(found)
+    product_id_index.record_fallback(len(found))
+    return unknown - found
 
 # GraphQL Schema
 class ProductObject(SQLAlchemyObjectType):
     class Meta:
         model = Product
+        exclude_fields = ('content_hash',)
+    
+    # Same JSON shape as before, now built from the indexed columns
+    rating = graphene.JSONString()
+    
+    def resolve_rating(self, info):
+        if self.rating_rate is None or self.rating_count is None:
+            return None
+        return {"rate": self.rating_rate, "count": self.rating_count}
+    
+    def resolve_id(self, info):
+        return self.id
+    
+    @classmethod
+    def is_type_of(cls, root, info):
+        # Listings and cached products come back as plain ProductRecords
+        return isinstance(root, ProductRecord) or super().is_type_of(root, info)
+
+# GraphQL field name -> Product columns it reads
+PRODUCT_FIELD_COLUMNS = column_map(Product, extra={'rating': ('rating_rate', 'rating_count')})
+
+def product_rows(names):
+    """Query selecting just the `names` columns
+    
+    Rows come back as plain tuples: no Product instances, identity map or
+    attribute instrumentation. Turn them into ProductRecords for
+    ProductObject to resolve.
+    """
+    return db_session.query(*(getattr(Product, name) for name in names))
+
+def product_records(names, rows):
+    return [ProductRecord.from_row(names, row) for row in rows]
+
+def listing_key(catalog_version, names, search, first, skip, category, min_price, max_price,
+                order_by):
+    """Cache key for an allProducts call; equivalent arguments share one key"""
+    return (
+        catalog_version, async_db.data_version(), names, search or None,
+        first or None, skip or 0, category, min_price, max_price, order_by
+    )
+
+class CategoryFacet(graphene.ObjectType):
+    """Product count and averages for one category"""
+    category = graphene.String()
+    count = graphene.Int()
+    average_price = graphene.Float()
+    average_rating = graphene.Float()
+
+class PriceBucket(graphene.ObjectType):
+    """Products priced in [min, max); max is null for the top bucket"""
+    min = graphene.Float()
+    max = graphene.Float()
+    count = graphene.Int()
+
+class CatalogFacets(graphene.ObjectType):
+    """Navigation facets read from the maintained summary tables"""
+    categories = graphene.List(CategoryFacet)
+    price_histogram = graphene.List(PriceBucket)
+
+class ProductConnection(graphene.relay.Connection):
+    """Relay-style page of products with opaque keyset cursors"""
+    class Meta:
+        node = ProductObject
+    
+    total_count = graphene.Int(estimate=graphene.Boolean(default_value=False))
+    
+    def resolve_total_count(self, info, estimate=False):
+        """Only counted when selected, using the connection's filters"""
+        return count_products(estimate=estimate, **self.filters)
+
+class ProductOrder(graphene.Enum):
+    """Sort orders for product listings, each backed by an index"""
+    ID_ASC = 'id_asc'
+    ID_DESC = 'id_desc'
+    PRICE_ASC = 'price_asc'
+    PRICE_DESC = 'price_desc'
+    RATING_ASC = 'rating_asc'
+    RATING_DESC = 'rating_desc'
+
+# ProductOrder value -> (sort column, descending)
+PRODUCT_ORDERINGS = {
+    'id_asc': (Product.id, False),
+    'id_desc': (Product.id, True),
+    'price_asc': (Product.price, False),
+    'price_desc': (Product.price, True),
+    'rating_asc': (Product.rating_rate, False),
+    'rating_desc': (Product.rating_rate, True),
+}
+
+def filter_products(query, category=None, min_price=None, max_price=None):
+    """Apply the browse filters; each combination has a matching composite index"""
+    if category is not None:
+        query = query.filter(Product.category == category)
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    return query
+
+def search_products(query, search):
+    """Restrict a product query to `search` matches, best FTS rank first
+    
+    Falls back to a LIKE scan of title and description without the FTS
+    index. Shared by the listing and its count so the two always agree.
+    """
+    search = ' '.join(search.split())
+    searched = apply_search(query, Product, search) if SEARCH_INDEX_ENABLED else None
+    if searched is not None:
+        return searched
+    return query.filter(
+        Product.title.contains(search) | 
+        Product.description.contains(search)
+    )
+
+def count_products(search=None, category=None, min_price=None, max_price=None,
+                   estimate=False):
+    """Total for a listing without scanning the products table
+    
+    Unfiltered and category-only totals come from the facet counters. Price
+    ranges are counted on the price indexes, searches on the FTS index. With
+    `estimate`, price ranges are read off the histogram and search counts
+    stop at ESTIMATE_COUNT_CAP.
+    """
+    has_price = min_price is not None or max_price is not None
+    
+    if FACETS_ENABLED and not search:
+        if category is None and not has_price:
+            return total_products(db_session)
+        if category and not has_price:
+            return category_total(db_session, category)
+        if estimate and has_price:
+            in_range = estimate_price_range(db_session, min_price, max_price)
+            if category:
+                total = total_products(db_session)
+                in_range *= category_total(db_session, category) / total if total else 0
+            return int(round(in_range))
+    
+    query = filter_products(db_session.query(Product.id), category, min_price, max_price)
+    if search:
+        query = search_products(query, search).order_by(None)
+        if estimate:
+            query = query.limit(ESTIMATE_COUNT_CAP)
+    
+    return db_session.query(func.count()).select_from(query.subquery()).scalar()
+
+def order_products(query, order_by):
+    """Sort by an index-backed key with id as the tie-breaker"""
+    column, descending = PRODUCT_ORDERINGS[order_by]
+    return query.order_by(*sort_order(column, Product.id, descending))
 
 class Query(graphene.ObjectType):
     # Get all products
@@ -51,32 +370,183 @@ class Query(graphene.ObjectType):
         ProductObject,
         search=graphene.String(),
         first=graphene.Int(),
-        skip=graphene.Int()
+        skip=graphene.Int(),
+        category=graphene.String(),
+        min_price=graphene.Float(),
+        max_price=graphene.Float(),
+        order_by=ProductOrder()
+    )
+    
+    # Total for allProducts with the same filters, without a table scan
+    all_products_count = graphene.Int(
+        search=graphene.String(),
+        category=graphene.String(),
+        min_price=graphene.Float(),
+        max_price=graphene.Float(),
+        estimate=graphene.Boolean(default_value=False)
+    )
+    
+    # Cursor-paginated products - constant cost per page at any depth
+    products_connection = graphene.Field(
+        ProductConnection,
+        first=graphene.Int(),
+        after=graphene.String(),
+        order_by=graphene.Argument(ProductOrder, default_value=ProductOrder.ID_ASC.value),
+        category=graphene.String(),
+        min_price=graphene.Float(),
+        max_price=graphene.Float()
     )
     
     # Get single product by id
     product = graphene.Field(ProductObject, product_id=graphene.Int())
     
-    def resolve_all_products(self, info, search=None, first=None, skip=0):
+    # Category counts, price histogram and average ratings for navigation
+    catalog_facets = graphene.Field(CatalogFacets)
+    
+    def resolve_all_products(self, info, search=None, first=None, skip=0,
+                             category=None, min_price=None, max_price=None, order_by=None):
         """Generl Search Query"""
-        query = Product.query
+        # Only load the columns the client asked for, as plain rows
+        names = tuple(sorted(requested_columns(info, PRODUCT_FIELD_COLUMNS, always=('id',))))
+        search = ' '.join(search.split()) if search else None
+        key = listing_key(_seen_catalog_version, names, search,
+                          first, skip, category, min_price, max_price, order_by)
+        cached = listing_cache.get(key)
+        if cached is not None:
+            return product_records(names, cached)
+        
+        query = filter_products(product_rows(names), category, min_price, max_price)
         
         if search:
-            query = query.filter(
-                Product.title.contains(search) | 
-                Product.description.contains(search)
-            )
+            query = search_products(query, search)
+        
+        if order_by:
+            # An explicit sort replaces search relevance ranking
+            query = order_products(query.order_by(None), order_by)
+        elif not search:
+            # Without a sort the planner's choice of index decides the order,
+            # which changes with the selected columns and breaks first/skip paging
+            query = order_products(query, 'id_asc')
         
         if skip:
             query = query.offset(skip)
         if first:
             query = query.limit(first)
-            
-        return query.all()
+        
+        rows = tuple(query.all())
+        listing_cache.put(key, rows)
+        return product_records(names, rows)
+    
+    def resolve_all_products_count(self, info, search=None, category=None,
+                                   min_price=None, max_price=None, estimate=False):
+        """Total matching allProducts' filters (ignores first/skip)"""
+        return count_products(search, category, min_price, max_price, estimate)
+    
+    def resolve_products_connection(self, info, first=None, after=None, order_by='id_asc',
+                                    category=None, min_price=None, max_price=None):
+        """Keyset pagination: WHERE (sort_key, id) > cursor ORDER BY sort_key, id"""
+        column, descending = PRODUCT_ORDERINGS[order_by]
+        # Selected node columns, plus the sort key the cursors are built from
+        names = tuple(sorted(requested_columns(
+            info, PRODUCT_FIELD_COLUMNS, ('edges', 'node'), always=('id', column.key)
+        )))
+        query = filter_products(product_rows(names), category, min_price, max_price)
+        rows, has_next_page = paginate(
+            query, column, Product.id, order_by, descending,
+            first=first, after=after
+        )
+        products = product_records(names, rows)
+        
+        edges = [
+            ProductConnection.Edge(
+                node=product,
+                cursor=encode_cursor(order_by, getattr(product, column.key), product.id)
+            )
+            for product in products
+        ]
+        connection = ProductConnection(
+            edges=edges,
+            page_info=graphene.relay.PageInfo(
+                has_next_page=has_next_page,
+                has_previous_page=bool(after),
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None
+            )
+        )
+        connection.filters = {
+            'category': category, 'min_price': min_price, 'max_price': max_price
+        }
+        return connection
+    
+    def resolve_catalog_facets(self, info):
+        """O(categories) read of the summary tables - never scans products"""
+        facets = read_facets(db_session)
+        return CatalogFacets(
+            categories=[CategoryFacet(**facet) for facet in facets['categories']],
+            price_histogram=[PriceBucket(**bucket) for bucket in facets['price_histogram']]
+        )
     
     def resolve_product(self, info, product_id):
-        """Get single product by id"""
-        return Product.query.filter_by(id=product_id).first()
+        """Get single product by id from the cache, else batched with the rest of the request"""
+        cached = product_cache.get(product_id)
+        if cached is not None:
+            return ProductRecord(**cached)
+        
+        version = product_cache.version()
+        
+        def remember(product):
+            if product is not None:
+                product_cache.put(product_id, ProductRecord.from_model(product).to_dict(), version)
+            return product
+        
+        return get_loader(info.context, Product).load(product_id).then(remember)
+
+# Largest list accepted by the bulk mutations
+MAX_BULK_ITEMS = int(os.environ.get('MAX_BULK_ITEMS', 1000))
+
+def build_product_data(title, price, description=None, category=None,
+                       image=None, rating_rate=None, rating_count=None):
+    """Column values for a new product from mutation arguments"""
+    rating = None
+    if rating_rate is not None and rating_count is not None:
+        rating = {"rate": rating_rate, "count": rating_count}
+    
+    return {
+        "title": title,
+        "price": price,
+        "description": description,
+        "category": category,
+        "image": image,
+        "rating": rating,
+        "rating_rate": rating_rate,
+        "rating_count": rating_count
+    }
+
+def build_product_updates(fields):
+    """Column updates for the arguments a client actually sent"""
+    updates = {
+        field: fields[field]
+        for field in ('title', 'price', 'description', 'category', 'image',
+                      'rating_rate', 'rating_count')
+        if field in fields
+    }
+    # The async writer rebuilds the legacy rating JSON from these columns
+    return updates
+
+def enqueue_write(fire_and_forget, *args):
+    """Hand a write to the async writer, surfacing load shedding as a retryable error"""
+    try:
+        fire_and_forget(*args)
+    except WriteQueueFull as e:
+        raise GraphQLError(str(e), extensions={'code': 'WRITE_QUEUE_FULL', 'retryable': True})
+
+def check_bulk_size(items):
+    """Error message if a bulk list is empty or too long, else None"""
+    if not items:
+        return "No items given"
+    if len(items) > MAX_BULK_ITEMS:
+        return f"Too many items: {len(items)} (max {MAX_BULK_ITEMS})"
+    return None
 
 class CreateProduct(graphene.Mutation):
     """Create Product Mutation"""
@@ -97,23 +567,13 @@ class CreateProduct(graphene.Mutation):
                image=None, rating_rate=None, rating_count=None):
         """TRUE ASYNC insert - fire and forget, no waiting for ID"""
         
-        # Build rating dict if provided
-        rating = None
-        if rating_rate is not None and rating_count is not None:
-            rating = {"rate": rating_rate, "count": rating_count}
-        
         # Prepare data for async insert
-        product_data = {
-            "title": title,
-            "price": price,
-            "description": description,
-            "category": category,
-            "image": image,
-            "rating": rating
-        }
+        product_data = build_product_data(
+            title, price, description, category, image, rating_rate, rating_count
+        )
         
         # Fire and forget - returns immediately without waiting
-        fire_and_forget_create(product_data)
+        enqueue_write(fire_and_forget_create, product_data)
         
         # Return success status immediately
         # The actual database write happens in the background
@@ -141,37 +601,18 @@ class UpdateProduct(graphene.Mutation):
     def mutate(self, info, product_id, **kwargs):
         """Asynch DB update"""
         
-        # Quick sync check if product exists
-        product = Product.query.filter_by(id=product_id).first()
-        
-        if not product:
+        # Existence check from memory; only unknown ids reach the database
+        if missing_product_ids((product_id,)):
             return UpdateProduct(
                 success=False, 
                 message=f"Product with ID {product_id} not found"
             )
         
         # Prepare update data
-        updates = {}
-        
-        if 'title' in kwargs:
-            updates['title'] = kwargs['title']
-        if 'price' in kwargs:
-            updates['price'] = kwargs['price']
-        if 'description' in kwargs:
-            updates['description'] = kwargs['description']
-        if 'category' in kwargs:
-            updates['category'] = kwargs['category']
-        if 'image' in kwargs:
-            updates['image'] = kwargs['image']
-        
-        if 'rating_rate' in kwargs and 'rating_count' in kwargs:
-            updates['rating'] = {
-                "rate": kwargs['rating_rate'], 
-                "count": kwargs['rating_count']
-            }
+        updates = build_product_updates(kwargs)
         
         # Fire and forget - returns immediately without waiting
-        fire_and_forget_update(product_id, updates)
+        enqueue_write(fire_and_forget_update, product_id, updates)
         
         # Return success status immediately
         # The actual database write happens in the background
@@ -196,61 +637,270 @@ class CreateProductSync(graphene.Mutation):
     def mutate(self, info, title, price, description=None, category=None, 
                image=None, rating_rate=None, rating_count=None):
         """Sync Insert for when you need the product back immediately"""
-        rating = None
-        if rating_rate is not None and rating_count is not None:
-            rating = {"rate": rating_rate, "count": rating_count}
-        
-        product = Product(
-            title=title,
-            price=price,
-            description=description,
-            category=category,
-            image=image,
-            rating=rating
-        )
+        product = Product(**build_product_data(
+            title, price, description, category, image, rating_rate, rating_count
+        ))
         
         db_session.add(product)
-        db_session.commit()
+        commit_products([product])
+        cache_product(product)
         
         return CreateProductSync(product=product)
 
+class ProductInput(graphene.InputObjectType):
+    """One product in a bulk create"""
+    title = graphene.String(required=True)
+    price = graphene.Float(required=True)
+    description = graphene.String()
+    category = graphene.String()
+    image = graphene.String()
+    rating_rate = graphene.Float()
+    rating_count = graphene.Int()
+
+class ProductUpdateInput(graphene.InputObjectType):
+    """One product in a bulk update - only the fields sent are changed"""
+    product_id = graphene.Int(required=True)
+    title = graphene.String()
+    price = graphene.Float()
+    description = graphene.String()
+    category = graphene.String()
+    image = graphene.String()
+    rating_rate = graphene.Float()
+    rating_count = graphene.Int()
+
+class CreateProducts(graphene.Mutation):
+    """Bulk Create Products Mutation"""
+    class Arguments:
+        items = graphene.List(graphene.NonNull(ProductInput), required=True)
+    
+    success = graphene.Boolean()
+    message = graphene.String()
+    count = graphene.Int()
+    
+    def mutate(self, info, items):
+        """Queue the whole list as one unit - written in a single transaction"""
+        error = check_bulk_size(items)
+        if error:
+            return CreateProducts(success=False, message=error, count=0)
+        
+        enqueue_write(fire_and_forget_create_many, [build_product_data(**item) for item in items])
+        
+        return CreateProducts(
+            success=True,
+            message=f"{len(items)} products queued for creation",
+            count=len(items)
+        )
+
+class UpdateProducts(graphene.Mutation):
+    """Bulk Update Products Mutation"""
+    class Arguments:
+        items = graphene.List(graphene.NonNull(ProductUpdateInput), required=True)
+    
+    success = graphene.Boolean()
+    message = graphene.String()
+    count = graphene.Int()
+    
+    def mutate(self, info, items):
+        """Check every id with one query, then queue the list as one unit"""
+        error = check_bulk_size(items)
+        if error:
+            return UpdateProducts(success=False, message=error, count=0)
+        
+        missing = sorted(missing_product_ids({item['product_id'] for item in items}))
+        if missing:
+            shown = ', '.join(str(product_id) for product_id in missing[:20])
+            return UpdateProducts(
+                success=False,
+                message=f"Products not found: {shown}" + (" ..." if len(missing) > 20 else ""),
+                count=0
+            )
+        
+        enqueue_write(fire_and_forget_update_many, [
+            (item['product_id'], build_product_updates(item)) for item in items
+        ])
+        
+        return UpdateProducts(
+            success=True,
+            message=f"{len(items)} products queued for update",
+            count=len(items)
+        )
+
+class CreateProductsSync(graphene.Mutation):
+    """Sync Bulk Insert for when you need the IDs back"""
+    class Arguments:
+        items = graphene.List(graphene.NonNull(ProductInput), required=True)
+    
+    ids = graphene.List(graphene.Int)
+    
+    def mutate(self, info, items):
+        """Insert every product in one transaction and return their ids in order"""
+        error = check_bulk_size(items)
+        if error:
+            raise GraphQLError(error)
+        
+        products = [Product(**build_product_data(**item)) for item in items]
+        db_session.add_all(products)
+        commit_products(products)
+        
+        return CreateProductsSync(ids=[product.id for product in products])
+
 class Mutation(graphene.ObjectType):
     create_product = CreateProduct.Field()  # Asynch DB insert
     update_product = UpdateProduct.Field()  # Asynch DB update
     create_product_sync = CreateProductSync.Field()  # Sync Insert for when you need the ID back
+    create_products = CreateProducts.Field()  # Asynch bulk insert, one transaction
+    update_products = UpdateProducts.Field()  # Asynch bulk update, one transaction
+    create_products_sync = CreateProductsSync.Field()  # Sync bulk insert returning IDs
 
 # GraphQL Schema
 schema = graphene.Schema(query=Query, mutation=Mutation)
 
+# Parsed + validated documents, and sha256 -> query for persisted queries
+document_backend = CachedDocumentBackend()
+persisted_queries = LRUCache(PERSISTED_QUERY_CACHE_SIZE)
+
+# Root query fields resolve concurrently on a bounded pool; product lookups
+# stay on the request thread so they keep batching through the DataLoader
+executor_pool = None
+if GRAPHQL_EXECUTOR == 'threads':
+    executor_pool = RootFieldPool(
+        GRAPHQL_MAX_WORKERS, teardown=db_session.remove, inline_fields=('product',)
+    )
+
 # GraphQL Endpoint
 app.add_url_rule(
     '/graphql',
-    view_func=GraphQLView.as_view(
+    view_func=ProductGraphQLView.as_view(
         'graphql',
         schema=schema,
+        backend=document_backend,
+        persisted_queries=persisted_queries,
+        executor_pool=executor_pool,
+        batch=True,  # JSON arrays of operations, up to GRAPHQL_MAX_BATCH_SIZE
+        encode=json_encode,  # orjson when installed
         graphiql=True  # Enable GraphiQL interface for testing
     )
 )
 
+# Startup budget: module import plus create_app(), in milliseconds
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 2000))
+
+startup_stats = {
+    'import_ms': None,
+    'create_app_ms': None,
+    'budget_ms': STARTUP_BUDGET_MS,
+    'within_budget': None,
+}
+_startup_lock = threading.Lock()
+
+def create_app():
+    """Prepare the database and return the app
+
+    Importing this module opens no connection and starts no thread, so it is
+    safe to call before forking workers (e.g. gunicorn --preload) as well as
+    in each worker. The async writer and the root field pool start lazily,
+    in whichever process serves the first request. Servers given `app:app`
+    instead get the same startup on their first request.
+    """
+    # Checked before the lock too, so requests after startup never wait on it
+    if startup_stats['create_app_ms'] is not None:
+        return app
+    with _startup_lock:
+        if startup_stats['create_app_ms'] is not None:
+            return app
+        started = time.perf_counter()
+        prepare_database()
+        product_id_index.warm(engine, Product.__table__)
+        startup_stats['create_app_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    total_ms = startup_stats['import_ms'] + startup_stats['create_app_ms']
+    startup_stats['within_budget'] = total_ms <= STARTUP_BUDGET_MS
+    print(f"Started in {total_ms:.0f}ms (import {startup_stats['import_ms']:.0f}ms, "
+          f"create_app {startup_stats['create_app_ms']:.0f}ms)")
+    if not startup_stats['within_budget']:
+        print(f"Startup exceeded STARTUP_BUDGET_MS={STARTUP_BUDGET_MS:.0f}")
+    return app
+
+# The writer thread doesn't survive a fork, so each process starts its own
+@app.before_request
+def start_services():
+    create_app()
+    async_db.start()
+    if FACETS_ENABLED:
+        catalog_watcher.start()
+
+# Pooled connections opened before a fork belong to the parent
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
 # Health Check Endpoint
 @app.route('/health')
 def health_check():
     return {'status': 'ok'}
 
+# Write pipeline metrics (batch sizes, flush latency, commit counts) and cache counters
+@app.route('/stats')
+def stats():
+    return {
+        'async_writer': async_db.get_stats(),
+        'product_cache': product_cache.stats(),
+        'listing_cache': listing_cache.stats(),
+        'catalog_version': _seen_catalog_version,
+        'product_id_index': product_id_index.stats(),
+        'document_cache': document_backend.documents.stats(),
+        'persisted_queries': persisted_queries.stats(),
+        'startup': startup_stats,
+    }
+
+# Streaming catalog dump for downstream systems - flat memory at any catalog size
+@app.route('/export/products')
+def export_catalog():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return {'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}, 400
+    chunk_size = request.args.get('chunk_size', EXPORT_CHUNK_SIZE, type=int)
+    if chunk_size < 1:
+        return {'error': 'chunk_size must be positive'}, 400
+    if chunk_size > MAX_EXPORT_CHUNK_SIZE:
+        return {'error': f'chunk_size must be at most {MAX_EXPORT_CHUNK_SIZE}'}, 400
+    
+    body = export_products(engine, Product.__table__, export_format, chunk_size,
+                           category=request.args.get('category'))
+    headers = {
+        'Content-Disposition': f'attachment; filename=products.{export_format}',
+        'Vary': 'Accept-Encoding',
+    }
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding:
+        body = compress_chunks(body, encoding)
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype=EXPORT_FORMATS[export_format], headers=headers)
+
+# gzip/deflate for large responses, negotiated from Accept-Encoding
+@app.after_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
+
 @app.teardown_appcontext
 def shutdown_session(exception=None):
     db_session.remove()
 
+startup_stats['import_ms'] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)
+
 if __name__ == '__main__':
+    create_app()
+    
     # Add sample product
-    if Product.query.count() == 0:
+    if count_products() == 0:
         sample_product = Product(
             title="Sample Laptop",
             price=999.99,
             description="A great laptop for developers",
             category="Electronics",
             image="https://example.com/laptop.jpg",
-            rating={"rate": 4.5, "count": 120}
+            rating={"rate": 4.5, "count": 120},
+            rating_rate=4.5,
+            rating_count=120
         )
         db_session.add(sample_product)
         db_session.commit()
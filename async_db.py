@@ -3,18 +3,56 @@ Async database operations for write operations
 """
 
 import asyncio
+import glob
 import threading
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
 import aiosqlite
 import json
 import os
-from queue import Queue
+import sqlite3
+from queue import Queue, Empty
 import time
 
+# Group-commit tuning: the worker drains up to BATCH_SIZE pending writes, or
+# whatever arrives within BATCH_WINDOW_MS of the first one, per transaction
+DEFAULT_BATCH_SIZE = int(os.environ.get('ASYNC_DB_BATCH_SIZE', 500))
+DEFAULT_BATCH_WINDOW_MS = float(os.environ.get('ASYNC_DB_BATCH_WINDOW_MS', 5))
+
+# Connection tuning for the long-lived writer connection
+DEFAULT_SYNCHRONOUS = os.environ.get('ASYNC_DB_SYNCHRONOUS', 'NORMAL').upper()
+DEFAULT_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+DEFAULT_CACHE_SIZE_KB = int(os.environ.get('ASYNC_DB_CACHE_SIZE_KB', 65536))
+
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Backpressure: the write queue holds at most QUEUE_SIZE operations. When it
+# is full, 'block' waits up to QUEUE_BLOCK_MS for room, 'reject' fails at
+# once, and 'spill' appends the write to a file next to the database that the
+# worker replays, in order, once the queue has drained.
+DEFAULT_QUEUE_SIZE = int(os.environ.get('ASYNC_DB_QUEUE_SIZE', 10000))
+DEFAULT_QUEUE_POLICY = os.environ.get('ASYNC_DB_QUEUE_POLICY', 'block').lower()
+DEFAULT_QUEUE_BLOCK_MS = float(os.environ.get('ASYNC_DB_QUEUE_BLOCK_MS', 100))
+
+QUEUE_POLICIES = ("block", "reject", "spill")
+
+UPDATABLE_FIELDS = ["title", "price", "description", "category", "image",
+                    "rating_rate", "rating_count"]
+
+INSERT_QUERY = """INSERT INTO products (title, price, description, category, image, rating,
+                                        rating_rate, rating_count)
+                  VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+class WriteQueueFull(Exception):
+    """The write queue is full and the overflow policy shed this write"""
+
 class AsyncProductDB:
     """Async wrapper for product write operations"""
-    
-    def __init__(self, db_path: str = None):
+
+    def __init__(self, db_path: str = None, batch_size: int = None,
+                 batch_window_ms: float = None, synchronous: str = None,
+                 busy_timeout_ms: int = None, cache_size_kb: int = None,
+                 queue_size: int = None, queue_policy: str = None,
+                 queue_block_ms: float = None, spill_path: str = None):
         if db_path is None:
             db_path = os.environ.get('DATABASE_URL', 'sqlite:///products.db')
             if db_path.startswith('sqlite:///'):
@@ -22,92 +60,694 @@ class AsyncProductDB:
             elif db_path.startswith('sqlite:////'):
                 db_path = db_path.replace('sqlite:////', '/')
         self.db_path = db_path
+        self.batch_size = max(1, batch_size or DEFAULT_BATCH_SIZE)
+        self.batch_window_ms = (DEFAULT_BATCH_WINDOW_MS if batch_window_ms is None
+                                else batch_window_ms)
+        self.synchronous = (synchronous or DEFAULT_SYNCHRONOUS).upper()
+        if self.synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"synchronous must be one of {', '.join(SYNCHRONOUS_LEVELS)}")
+        self.busy_timeout_ms = (DEFAULT_BUSY_TIMEOUT_MS if busy_timeout_ms is None
+                                else busy_timeout_ms)
+        self.cache_size_kb = DEFAULT_CACHE_SIZE_KB if cache_size_kb is None else cache_size_kb
+        self._db = None
+        # Query for the shared, trigger-maintained catalog version, read just
+        # before each commit when set (see facets.py)
+        self.version_query = None
+        self._commit_listeners = []
+        self._data_version = 0
+        self.queue_policy = (queue_policy or DEFAULT_QUEUE_POLICY).lower()
+        if self.queue_policy not in QUEUE_POLICIES:
+            raise ValueError(f"queue_policy must be one of {', '.join(QUEUE_POLICIES)}")
+        self.queue_block_ms = DEFAULT_QUEUE_BLOCK_MS if queue_block_ms is None else queue_block_ms
+        # The bound is on queued rows, not operations: a bulk operation
+        # carries up to MAX_BULK_ITEMS rows in one queue entry
+        self.queue_capacity = max(1, queue_size or DEFAULT_QUEUE_SIZE)
+        self.write_queue = Queue()
+        self._queue_room = threading.Condition()
+        self._queued_rows = 0
+        # Drained past a full batch; it opens the next one
+        self._held = None
+        # Without an explicit path each process spills to its own file,
+        # chosen in start() once the process id is final
+        self._spill_base = spill_path
+        self.spill_path = spill_path
+        self._spill_lock = threading.Lock()
+        self._spill_file = None
+        self._spill_reader = None
+        self._spill_replay = []
+        self._spill_pending = 0
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'batches': 0,
+            'operations': 0,
+            'commits': 0,
+            'failed_batches': 0,
+            'failed_operations': 0,
+            'coalesced': 0,
+            'connects': 0,
+            'reconnects': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0,
+            'last_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'blocked': 0,
+            'rejected': 0,
+            'spilled': 0,
+            'spill_rejected': 0,
+            'split_batches': 0,
+        }
+        # Nothing runs until start(), so importing this module is cheap and a
+        # process can fork before any thread exists
+        self.worker_thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def start(self):
+        """Start the worker in this process; a no-op if it already runs here"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.spill_path = self._spill_base or f"{self.db_path}.{os.getpid()}.spill"
+            self._recover_spill()
+            self._start_worker_thread()
+            self._pid = os.getpid()
+
+    def _after_fork(self):
+        """Drop the parent's worker state in a forked child
+
+        The worker thread, its connection and any lock it held don't carry
+        over; writes still queued belong to the parent, which flushes them.
+        The child starts its own worker on its first start().
+        """
+        self._pid = None
+        self.worker_thread = None
+        self._db = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._spill_file = None
+        self._spill_reader = None
+        self._spill_replay = []
+        self._spill_pending = 0
         self.write_queue = Queue()
-        self._start_worker_thread()
-    
+        self._queue_room = threading.Condition()
+        self._queued_rows = 0
+        self._held = None
+        self._stats = dict.fromkeys(self._stats, 0)
+
     def _start_worker_thread(self):
         """Start a background thread to process writes"""
         self.worker_thread = threading.Thread(target=self._process_writes, daemon=True)
         self.worker_thread.start()
-    
+
     def _process_writes(self):
-        """Background worker that processes writes"""
+        """Background worker that group-commits queued writes"""
         asyncio.set_event_loop(asyncio.new_event_loop())
         loop = asyncio.get_event_loop()
-        
+
+        # Open the writer connection up front so the database is in WAL mode
+        # before the first read; failures are retried on the first batch
+        try:
+            loop.run_until_complete(self._get_connection())
+        except Exception as e:
+            print(f"Async writer could not connect yet: {e}")
+
         while True:
             try:
-                # Get next write from queue
-                operation = self.write_queue.get(timeout=1)
-                
-                if operation['type'] == 'create':
-                    loop.run_until_complete(self._async_create(operation['data']))
-                elif operation['type'] == 'update':
-                    loop.run_until_complete(self._async_update(operation['id'], operation['data']))
-                
-            except:
-                # Queue is empty, continue
+                batch = self._next_batch()
+            except Exception as e:
+                # Never let a bad spill file or queue error stop the worker
+                print(f"Async writer could not read pending writes: {e}")
+                time.sleep(1)
+                continue
+            if not batch:
+                continue
+
+            size = sum(self._operation_count(operation) for operation in batch)
+            started = time.perf_counter()
+            try:
+                written = loop.run_until_complete(self._async_apply_batch(batch))
+            except Exception as e:
+                self._record_failure(size)
+                print(f"Async batch of {size} writes failed: {e}")
+                continue
+            self._record_flush(size, (time.perf_counter() - started) * 1000, written is not None)
+            if written is not None:
+                self.mark_committed(*written)
+
+    def add_commit_listener(self, listener: Callable[[Set[int], Set[int], Optional[tuple]], None]):
+        """Call `listener(product_ids, created_ids, versions)` after every commit
+
+        `product_ids` holds every product id the commit wrote, for cache
+        invalidation, and `created_ids` the ones it inserted. `versions` is
+        the shared catalog version (before, after) the commit, if known.
+        """
+        self._commit_listeners.append(listener)
+
+    def data_version(self) -> int:
+        """Counter bumped on every commit to products, for result caches"""
+        return self._data_version
+
+    def mark_committed(self, product_ids: Set[int], created_ids: Set[int] = frozenset(),
+                       versions: Optional[tuple] = None):
+        """Bump the data version and notify listeners of a commit
+
+        Called by the worker after each batch, and by the synchronous write
+        paths so caches see their commits too.
+        """
+        with self._stats_lock:
+            self._data_version += 1
+        for listener in self._commit_listeners:
+            try:
+                listener(product_ids, created_ids, versions)
+            except Exception as e:
+                print(f"Commit listener failed: {e}")
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Block for the first queued write, then drain the rest of the batch"""
+        spilled = self._next_spilled_batch()
+        if spilled:
+            return spilled
+
+        if self._held is not None:
+            batch, self._held = [self._held], None
+        else:
+            try:
+                batch = [self._dequeue(timeout=1)]
+            except Empty:
+                return []
+
+        # Batches are sized in rows; a bulk operation counts each of its rows
+        rows = self._operation_count(batch[0])
+        deadline = time.monotonic() + self.batch_window_ms / 1000
+        while rows < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    operation = self._dequeue(timeout=remaining)
+                else:
+                    # Window elapsed - still take whatever is already pending
+                    operation = self._dequeue()
+            except Empty:
+                break
+            count = self._operation_count(operation)
+            if rows + count > self.batch_size:
+                self._held = operation
+                break
+            batch.append(operation)
+            rows += count
+        return batch
+
+    def _dequeue(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Take the next queued operation and free its rows' room in the queue"""
+        if timeout is None:
+            operation = self.write_queue.get_nowait()
+        else:
+            operation = self.write_queue.get(timeout=timeout)
+        with self._queue_room:
+            self._queued_rows -= self._operation_count(operation)
+            self._queue_room.notify_all()
+        return operation
+
+    def _reserve(self, rows: int, timeout: float = 0) -> bool:
+        """Claim room for `rows` queued rows, waiting up to `timeout` seconds
+
+        An operation larger than the whole queue is let in once the queue
+        is empty, so it isn't refused forever.
+        """
+        def fits():
+            return not self._queued_rows or self._queued_rows + rows <= self.queue_capacity
+
+        with self._queue_room:
+            if not fits() and not (timeout and self._queue_room.wait_for(fits, timeout)):
+                return False
+            self._queued_rows += rows
+        return True
+
+    def _queue_empty(self) -> bool:
+        return self._held is None and self.write_queue.empty()
+
+    def _recover_spill(self):
+        """Queue for replay the writes spilled to disk by processes that are gone
+
+        Each orphaned file is renamed to this process's name before it is
+        read, so when several workers start at once only one replays it.
+        Files are replayed oldest stage first: half-replayed, draining, spilled.
+        """
+        if self._spill_base:
+            prefix = glob.escape(self._spill_base)
+        else:
+            prefix = f"{glob.escape(self.db_path)}.*spill"
+        candidates = []
+        for suffix in ('.recovered.*', '.draining', ''):
+            candidates += sorted(glob.glob(prefix + suffix))
+
+        for path in candidates:
+            if path in self._spill_replay or not self._spill_is_orphaned(path):
+                continue
+            if path.startswith(f"{self.spill_path}.recovered."):
+                self._spill_replay.append(path)
+                continue
+            index = len(self._spill_replay)
+            while os.path.exists(f"{self.spill_path}.recovered.{index}"):
+                index += 1
+            claimed = f"{self.spill_path}.recovered.{index}"
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue  # Another worker claimed it first
+            self._spill_replay.append(claimed)
+
+    def _spill_is_orphaned(self, path: str) -> bool:
+        """True for spill files of this path or of a process that has exited"""
+        if self._spill_base:
+            return os.path.exists(path)
+        name = os.path.basename(path)[len(os.path.basename(self.db_path)) + 1:]
+        owner = name.split('.')[0]
+        if not owner.isdigit():
+            return True  # Single-process `<database>.spill` from older versions
+        pid = int(owner)
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def _spill(self, operation: Dict[str, Any]):
+        """Append a write to the spill file - caller holds _spill_lock"""
+        if self._spill_file is None:
+            self._spill_file = open(self.spill_path, 'a', encoding='utf-8')
+        self._spill_file.write(json.dumps(operation) + "\n")
+        self._spill_file.flush()
+        self._spill_pending += 1
+        with self._stats_lock:
+            self._stats['spilled'] += self._operation_count(operation)
+
+    def _next_spilled_batch(self) -> List[Dict[str, Any]]:
+        """Replay spilled writes once everything queued before them is flushed
+
+        While writes are pending on disk new ones are spilled too, so the file
+        always holds the newest writes and queue-then-file keeps queue order.
+        """
+        if self._spill_reader is None:
+            if not self._spill_replay:
+                if not self._spill_pending or not self._queue_empty():
+                    return []
+                with self._spill_lock:
+                    if self._spill_file is not None:
+                        self._spill_file.close()
+                        self._spill_file = None
+                    draining = f"{self.spill_path}.draining"
+                    os.replace(self.spill_path, draining)
+                    self._spill_pending = 0
+                self._spill_replay.append(draining)
+            try:
+                self._spill_reader = open(self._spill_replay[0], encoding='utf-8')
+            except FileNotFoundError:
+                self._spill_replay.pop(0)
+                return []
+
+        batch = []
+        rows = 0
+        for line in self._spill_reader:
+            if not line.strip():
+                continue
+            try:
+                operation = json.loads(line)
+            except ValueError:
+                self._reject_spilled_line(line)
                 continue
-    
-    async def _async_create(self, product_data: Dict[str, Any]):
-        """Asynch DB insert"""
-        async with aiosqlite.connect(self.db_path) as db:
-            rating_json = None
-            if product_data.get("rating"):
-                rating_json = json.dumps(product_data.get("rating"))
-            
-            await db.execute(
-                """INSERT INTO products (title, price, description, category, image, rating)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (
-                    product_data.get("title"),
-                    product_data.get("price"),
-                    product_data.get("description"),
-                    product_data.get("category"),
-                    product_data.get("image"),
-                    rating_json
-                )
+            batch.append(operation)
+            # A spilled bulk operation can carry the batch past batch_size
+            rows += self._operation_count(operation)
+            if rows >= self.batch_size:
+                return batch
+
+        self._spill_reader.close()
+        os.remove(self._spill_reader.name)
+        self._spill_reader = None
+        self._spill_replay.pop(0)
+        return batch
+
+    def _reject_spilled_line(self, line: str):
+        """Set aside an unreadable spill line (e.g. cut short by a crash)"""
+        with open(f"{self.spill_path}.rejected", 'a', encoding='utf-8') as rejected:
+            rejected.write(line if line.endswith("\n") else line + "\n")
+        with self._stats_lock:
+            self._stats['spill_rejected'] += 1
+        print(f"Skipped unreadable spilled write, kept in {self.spill_path}.rejected")
+
+    def _plan_batch(self, batch: List[Dict[str, Any]]) -> Tuple[List[Tuple[str, List[tuple]]], Set[int]]:
+        """Coalesce the batch, then group rows sharing a statement into executemany runs
+
+        Returns the plan and the ids of the products it updates. After
+        coalescing each product id has a single update, so rows can be
+        regrouped freely.
+        """
+        plan = []
+        groups = {}
+        product_ids = set()
+        for kind, product_id, fields in self._coalesce(batch):
+            if kind == 'create':
+                statement, params = self._insert_statement(fields)
+            else:
+                statement, params = self._update_statement(product_id, fields)
+                if statement is None:
+                    continue
+                product_ids.add(product_id)
+
+            rows = groups.get(statement)
+            if rows is None:
+                rows = groups[statement] = []
+                plan.append((statement, rows))
+            rows.append(params)
+        return plan, product_ids
+
+    def _coalesce(self, batch: List[Dict[str, Any]]) -> List[list]:
+        """Fold pending updates into one entry per product, last writer wins
+
+        Creates get their id from SQLite when they are inserted, so nothing
+        queued can target them yet; they pass through unchanged.
+        """
+        entries = []
+        latest = {}
+        merged = 0
+        for kind, product_id, fields in self._expand_batch(batch):
+            if kind == 'update':
+                entry = latest.get(product_id)
+                if entry is not None:
+                    entry[2].update(fields)
+                    merged += 1
+                    continue
+
+            entry = [kind, product_id, dict(fields)]
+            entries.append(entry)
+            if kind == 'update':
+                latest[product_id] = entry
+
+        if merged:
+            with self._stats_lock:
+                self._stats['coalesced'] += merged
+        return entries
+
+    def _expand_batch(self, batch: List[Dict[str, Any]]):
+        """Yield (kind, product_id, fields) for every row the queued operations write"""
+        for operation in batch:
+            if operation['type'] == 'create':
+                yield 'create', None, operation['data']
+            elif operation['type'] == 'create_many':
+                for product_data in operation['data']:
+                    yield 'create', None, product_data
+            elif operation['type'] == 'update':
+                yield 'update', operation['id'], operation['data']
+            elif operation['type'] == 'update_many':
+                for product_id, updates in operation['data']:
+                    yield 'update', product_id, updates
+
+    @staticmethod
+    def _operation_count(operation: Dict[str, Any]) -> int:
+        """Rows a queued operation writes - bulk operations carry many"""
+        if operation['type'] in ('create_many', 'update_many'):
+            return len(operation['data'])
+        return 1
+
+    @staticmethod
+    def _insert_statement(product_data: Dict[str, Any]):
+        rating_json = None
+        if product_data.get("rating"):
+            rating_json = json.dumps(product_data.get("rating"))
+
+        params = (
+            product_data.get("title"),
+            product_data.get("price"),
+            product_data.get("description"),
+            product_data.get("category"),
+            product_data.get("image"),
+            rating_json,
+            product_data.get("rating_rate"),
+            product_data.get("rating_count")
+        )
+        return INSERT_QUERY, params
+
+    @staticmethod
+    def _update_statement(product_id: int, updates: Dict[str, Any]):
+        update_fields = []
+        values = []
+
+        for field in UPDATABLE_FIELDS:
+            if field in updates:
+                update_fields.append(f"{field} = ?")
+                values.append(updates[field])
+
+        if "rating_rate" in updates or "rating_count" in updates:
+            # Rebuild the legacy JSON from the merged values; SET expressions
+            # see the row as it was, so an unsent half keeps its stored value
+            rate, count = ("?" if field in updates else field
+                           for field in ("rating_rate", "rating_count"))
+            update_fields.append(
+                f"rating = CASE WHEN {rate} IS NULL OR {count} IS NULL THEN NULL "
+                f"ELSE json_object('rate', {rate}, 'count', {count}) END"
             )
-            await db.commit()
-            print(f"Async created product: {product_data.get('title')}")
-    
-    async def _async_update(self, product_id: int, updates: Dict[str, Any]):
-        """Asynch DB update"""
-        async with aiosqlite.connect(self.db_path) as db:
-            update_fields = []
-            values = []
-            
-            for field in ["title", "price", "description", "category", "image"]:
-                if field in updates:
-                    update_fields.append(f"{field} = ?")
-                    values.append(updates[field])
-            
-            if "rating" in updates:
-                update_fields.append("rating = ?")
-                values.append(json.dumps(updates["rating"]))
-            
-            if not update_fields:
+            # Each placeholder appears twice, in the order rate, count, rate, count
+            values.extend([updates[field] for field in ("rating_rate", "rating_count")
+                           if field in updates] * 2)
+        elif "rating" in updates:
+            update_fields.append("rating = ?")
+            values.append(json.dumps(updates["rating"]))
+
+        if not update_fields:
+            return None, None
+
+        values.append(product_id)
+        query = f"UPDATE products SET {', '.join(update_fields)} WHERE id = ?"
+        return query, tuple(values)
+
+    async def _get_connection(self) -> aiosqlite.Connection:
+        """Return the long-lived writer connection, opening it if needed"""
+        if self._db is not None:
+            return self._db
+
+        connection = aiosqlite.connect(self.db_path)
+        # Don't let the connection thread keep the interpreter alive on exit
+        connection.daemon = True
+        db = await connection
+        try:
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute(f"PRAGMA synchronous={self.synchronous}")
+            await db.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            # Negative cache_size is in KiB rather than pages
+            await db.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        except Exception:
+            await db.close()
+            raise
+
+        self._db = db
+        with self._stats_lock:
+            self._stats['connects'] += 1
+        return db
+
+    async def _reset_connection(self):
+        """Drop the writer connection so the next batch reconnects"""
+        db, self._db = self._db, None
+        if db is None:
+            return
+        try:
+            await db.rollback()
+            await db.close()
+        except Exception:
+            pass
+
+    async def _async_apply_batch(self, batch: List[Dict[str, Any]]) -> Optional[tuple]:
+        """Apply a batch of writes in a single transaction
+
+        Returns (ids written, ids created, versions), or None if there was
+        nothing to commit. `versions` is the (before, after) pair of the
+        shared catalog version, or None without a `version_query`.
+        """
+        plan, product_ids = self._plan_batch(batch)
+        if not plan:
+            return None
+        auto_ids = any(statement == INSERT_QUERY for statement, _ in plan)
+        created_ids = set()
+
+        # One retry on a fresh connection covers a connection that went bad
+        # between batches (file replaced, I/O error, closed thread)
+        for attempt in range(2):
+            db = await self._get_connection()
+            try:
+                if auto_ids:
+                    cursor = await db.execute("SELECT COALESCE(MAX(id), 0) FROM products")
+                    (previous_max,) = await cursor.fetchone()
+                changed = 0
+                for statement, rows in plan:
+                    cursor = await db.executemany(statement, rows)
+                    changed += max(cursor.rowcount, 0)
+                versions = None
+                if self.version_query:
+                    # Read inside the transaction: the counter moved by
+                    # exactly the rows we changed
+                    cursor = await db.execute(self.version_query)
+                    (after,) = await cursor.fetchone()
+                    versions = (after - changed, after)
+                if auto_ids:
+                    # Rows above the old maximum are ours (or were committed
+                    # just before us, which exist all the same)
+                    cursor = await db.execute(
+                        "SELECT id FROM products WHERE id > ?", (previous_max,)
+                    )
+                    created_ids |= {row[0] for row in await cursor.fetchall()}
+                await db.commit()
+                break
+            except (sqlite3.Error, ValueError) as e:
+                if not self._is_connection_error(e):
+                    # A bad row: retrying it can't succeed, but the rest of
+                    # the batch shouldn't fail with it
+                    await self._rollback()
+                    if len(batch) > 1:
+                        return await self._apply_separately(batch, e)
+                    raise
+                await self._reset_connection()
+                if attempt:
+                    raise
+                with self._stats_lock:
+                    self._stats['reconnects'] += 1
+                print(f"Async writer reconnecting after error: {e}")
+        rows = sum(len(params) for _, params in plan)
+        print(f"Async flushed {rows} writes in {len(plan)} statements")
+        return product_ids | created_ids, created_ids, versions
+
+    @staticmethod
+    def _is_connection_error(error: Exception) -> bool:
+        """Errors a fresh connection may fix, as opposed to ones caused by the rows"""
+        if isinstance(error, ValueError):
+            return True  # aiosqlite: no active connection
+        if isinstance(error, sqlite3.ProgrammingError):
+            return 'closed' in str(error)
+        # I/O errors, locking, a replaced or corrupt file; not constraint or binding errors
+        return type(error) in (sqlite3.OperationalError, sqlite3.DatabaseError)
+
+    async def _rollback(self):
+        try:
+            await self._db.rollback()
+        except Exception:
+            await self._reset_connection()
+
+    async def _apply_separately(self, batch: List[Dict[str, Any]],
+                                error: Exception) -> Optional[Tuple[Set[int], Set[int], None]]:
+        """Apply a failed batch's queued operations one transaction each
+
+        Only the operations that fail on their own are lost; a bulk operation
+        still commits or fails as a unit. The separate commits report no
+        catalog versions, as others may have written in between.
+        """
+        print(f"Async batch failed ({error}); applying its {len(batch)} operations one by one")
+        with self._stats_lock:
+            self._stats['split_batches'] += 1
+        product_ids, created_ids = set(), set()
+        committed = False
+        for operation in batch:
+            try:
+                written = await self._async_apply_batch([operation])
+            except Exception as e:
+                self._record_failure(self._operation_count(operation))
+                print(f"Async {operation['type']} failed: {e}")
+                continue
+            if written is not None:
+                committed = True
+                product_ids |= written[0]
+                created_ids |= written[1]
+        return (product_ids, created_ids, None) if committed else None
+
+    def _record_flush(self, size: int, elapsed_ms: float, committed: bool):
+        with self._stats_lock:
+            stats = self._stats
+            stats['batches'] += 1
+            stats['commits'] += 1 if committed else 0
+            stats['operations'] += size
+            stats['last_batch_size'] = size
+            stats['max_batch_size'] = max(stats['max_batch_size'], size)
+            stats['last_flush_ms'] = round(elapsed_ms, 3)
+            stats['total_flush_ms'] += elapsed_ms
+
+    def _record_failure(self, size: int):
+        with self._stats_lock:
+            self._stats['failed_batches'] += 1
+            self._stats['failed_operations'] += size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of writer configuration and group-commit counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total_flush_ms = stats.pop('total_flush_ms')
+        stats['avg_flush_ms'] = (round(total_flush_ms / stats['batches'], 3)
+                                 if stats['batches'] else 0.0)
+        stats['avg_batch_size'] = (round(stats['operations'] / stats['batches'], 2)
+                                   if stats['batches'] else 0.0)
+        stats['batch_size'] = self.batch_size
+        stats['batch_window_ms'] = self.batch_window_ms
+        stats['synchronous'] = self.synchronous
+        stats['running'] = self._pid == os.getpid()
+        stats['connected'] = self._db is not None
+        stats['data_version'] = self._data_version
+        stats['queue_depth'] = self._queued_rows
+        stats['queue_capacity'] = self.queue_capacity
+        stats['queued_operations'] = self.write_queue.qsize()
+        stats['queue_policy'] = self.queue_policy
+        stats['spill_pending'] = self._spill_pending + len(self._spill_replay)
+        return stats
+
+    def _enqueue(self, operation: Dict[str, Any]):
+        """Queue a write, applying the overflow policy when the queue is full
+
+        Raises WriteQueueFull when the write was shed.
+        """
+        self.start()
+        rows = self._operation_count(operation)
+        if self.queue_policy == 'spill':
+            with self._spill_lock:
+                if not self._spill_pending and self._reserve(rows):
+                    self.write_queue.put(operation)
+                    return
+                self._spill(operation)
+            return
+
+        if self._reserve(rows):
+            self.write_queue.put(operation)
+            return
+
+        if self.queue_policy == 'block':
+            with self._stats_lock:
+                self._stats['blocked'] += 1
+            if self._reserve(rows, timeout=self.queue_block_ms / 1000):
+                self.write_queue.put(operation)
                 return
-            
-            values.append(product_id)
-            query = f"UPDATE products SET {', '.join(update_fields)} WHERE id = ?"
-            
-            await db.execute(query, values)
-            await db.commit()
-            print(f"Async updated product ID: {product_id}")
-    
+
+        with self._stats_lock:
+            self._stats['rejected'] += rows
+        raise WriteQueueFull(
+            f"Write queue is full ({self.queue_capacity} pending writes), retry later"
+        )
+
     def create_product_async(self, product_data: Dict[str, Any]):
         """Queue a product creation"""
-        self.write_queue.put({
+        self._enqueue({
             'type': 'create',
             'data': product_data
         })
         # Return immediately - truly async
         return None
-    
+
     def update_product_async(self, product_id: int, updates: Dict[str, Any]):
         """Queue a product update"""
-        self.write_queue.put({
+        self._enqueue({
             'type': 'update',
             'id': product_id,
             'data': updates
@@ -115,7 +755,23 @@ class AsyncProductDB:
         # Return immediately - truly async
         return None
 
-# Singleton instance for the app
+    def create_products_async(self, products: List[Dict[str, Any]]):
+        """Queue a bulk creation - applied as one unit in a single transaction"""
+        self._enqueue({
+            'type': 'create_many',
+            'data': list(products)
+        })
+        return None
+
+    def update_products_async(self, updates: List[Tuple[int, Dict[str, Any]]]):
+        """Queue (product_id, updates) pairs - applied as one unit in a single transaction"""
+        self._enqueue({
+            'type': 'update_many',
+            'data': list(updates)
+        })
+        return None
+
+# Singleton instance for the app; its worker starts on first use
 async_db = AsyncProductDB()
 
 # Wrapper functions
@@ -128,3 +784,13 @@ def fire_and_forget_update(product_id: int, updates: Dict[str, Any]):
     """Fire and forget update - returns None immediately"""
     async_db.update_product_async(product_id, updates)
     return None
+
+def fire_and_forget_create_many(products: List[Dict[str, Any]]):
+    """Fire and forget bulk create - returns None immediately"""
+    async_db.create_products_async(products)
+    return None
+
+def fire_and_forget_update_many(updates: List[Tuple[int, Dict[str, Any]]]):
+    """Fire and forget bulk update - returns None immediately"""
+    async_db.update_products_async(updates)
+    return None
@@ -0,0 +1,217 @@
+"""
+Streaming bulk import of products from JSONL or CSV
+
+Records are read lazily and inserted with core `executemany` in large
+chunks, one transaction per chunk, with `PRAGMA synchronous=OFF` on the
+import connection. The FTS and facet triggers and the secondary indexes are
+dropped for the load and rebuilt once at the end, which is far cheaper than
+maintaining them row by row.
+
+Each chunk commits together with its position in the file, in the
+`import_progress` table, so an interrupted import resumes where it stopped.
+Starting such an import over would insert its committed rows a second time,
+so that is refused unless forced. The derived objects are rebuilt even when
+the load fails; if the process is killed instead, the app's startup checks
+recreate them.
+"""
+
+import csv
+import json
+import os
+import time
+from itertools import islice
+from typing import Any, Dict, Iterator, Optional
+from sqlalchemy import text
+
+from facets import TRIGGER_NAMES as FACET_TRIGGERS, ensure_facets
+from migrations import ensure_indexes
+from search_index import TRIGGER_NAMES as SEARCH_TRIGGERS, ensure_search_index
+
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 10000))
+# Page cache for the import connection, in KiB
+IMPORT_CACHE_SIZE_KB = 262144
+# Seconds between progress lines
+REPORT_INTERVAL = 5.0
+
+PROGRESS_TABLE = """CREATE TABLE IF NOT EXISTS import_progress (
+    source TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    records INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER NOT NULL DEFAULT 0,
+    finished INTEGER NOT NULL DEFAULT 0
+)"""
+
+def read_records(path: str, file_format: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Yield raw records from a .jsonl/.ndjson or .csv file, one at a time"""
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, newline='' if file_format == 'csv' else None, encoding='utf-8') as f:
+        if file_format == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            # Unparseable and blank lines become empty (invalid) records so
+            # record positions stay stable for resuming
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = {}
+            yield record if isinstance(record, dict) else {}
+
+def _number(value, kind):
+    if value is None or value == '':
+        return None
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+def product_row(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Column values for one record, or None if it lacks a title or price
+
+    Accepts the export formats: a nested `rating` object (NDJSON) or flat
+    rating_rate/rating_count columns (CSV).
+    """
+    title = record.get('title')
+    price = _number(record.get('price'), float)
+    if not title or price is None:
+        return None
+
+    rating = record.get('rating')
+    if isinstance(rating, str) and rating:
+        try:
+            rating = json.loads(rating)
+        except ValueError:
+            rating = None
+    if not isinstance(rating, dict):
+        rating = {}
+    rate = _number(record.get('rating_rate', rating.get('rate')), float)
+    count = _number(record.get('rating_count', rating.get('count')), int)
+
+    return {
+        'id': _number(record.get('id'), int),
+        'title': title,
+        'price': price,
+        'description': record.get('description') or None,
+        'category': record.get('category') or None,
+        'image': record.get('image') or None,
+        'rating': {'rate': rate, 'count': count} if rate is not None and count is not None else None,
+        'rating_rate': rate,
+        'rating_count': count,
+    }
+
+def fingerprint(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def _drop_derived(conn, table):
+    """Drop triggers and secondary indexes so inserts only touch the table"""
+    for name in SEARCH_TRIGGERS + FACET_TRIGGERS:
+        conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS "{name}"')
+    for index in table.indexes:
+        conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{index.name}"')
+
+def _rebuild_derived(engine, table):
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        ensure_indexes(conn, table)
+    ensure_search_index(engine)
+    ensure_facets(engine)
+    print(f"Rebuilt indexes, search index and facets in {time.perf_counter() - started:.1f}s")
+
+def import_file(engine, table, path: str, file_format: Optional[str] = None,
+                chunk_size: int = IMPORT_CHUNK_SIZE, restart: bool = False,
+                force: bool = False) -> int:
+    """Import `path` into `table`, resuming a previous run; returns rows inserted
+
+    Raises ValueError instead of starting over an unfinished run that already
+    committed rows (restart, or the file changed), unless `force` is given.
+    """
+    if engine.dialect.name != 'sqlite':
+        raise ValueError("Bulk import only supports SQLite databases")
+
+    source = os.path.abspath(path)
+    current = fingerprint(path)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(PROGRESS_TABLE)
+        progress = conn.execute(
+            text("SELECT fingerprint, records, rows, finished FROM import_progress WHERE source = :source"),
+            {'source': source}
+        ).first()
+        if progress is None or restart or progress.fingerprint != current:
+            changed = progress is not None and progress.fingerprint != current
+            if progress is not None and not progress.finished and progress.rows and not force:
+                reason = "changed since" if changed else "is being restarted after"
+                raise ValueError(
+                    f"{path} {reason} an unfinished import that already inserted "
+                    f"{progress.rows} rows; starting over would insert them again. "
+                    f"Resume with the original file, remove those rows, or use --force."
+                )
+            if changed and not restart:
+                print(f"{path} changed since the last run, starting over")
+            conn.execute(
+                text("""INSERT OR REPLACE INTO import_progress (source, fingerprint)
+                        VALUES (:source, :fingerprint)"""),
+                {'source': source, 'fingerprint': current}
+            )
+            records_done, rows_done = 0, 0
+        elif progress.finished:
+            print(f"{path} was already imported ({progress.rows} rows); use --restart to import again")
+            return 0
+        else:
+            records_done, rows_done = progress.records, progress.rows
+            print(f"Resuming {path} after {records_done} records")
+
+    insert = table.insert()
+    started = time.perf_counter()
+    last_report = started
+    inserted = skipped = 0
+
+    with engine.connect() as conn:
+        previous_synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+        previous_cache_size = conn.exec_driver_sql("PRAGMA cache_size").scalar()
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.exec_driver_sql(f"PRAGMA cache_size=-{IMPORT_CACHE_SIZE_KB}")
+        try:
+            with conn.begin():
+                _drop_derived(conn, table)
+
+            records = islice(read_records(path, file_format), records_done, None)
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                rows = [row for row in map(product_row, chunk) if row is not None]
+                records_done += len(chunk)
+                skipped += len(chunk) - len(rows)
+                with conn.begin():
+                    if rows:
+                        conn.execute(insert, rows)
+                    conn.execute(
+                        text("""UPDATE import_progress SET records = :records, rows = :rows
+                                WHERE source = :source"""),
+                        {'records': records_done, 'rows': rows_done + inserted + len(rows),
+                         'source': source}
+                    )
+                inserted += len(rows)
+
+                now = time.perf_counter()
+                if now - last_report >= REPORT_INTERVAL:
+                    last_report = now
+                    print(f"  {rows_done + inserted} rows ({inserted / (now - started):,.0f} rows/sec)")
+        finally:
+            conn.exec_driver_sql(f"PRAGMA synchronous={previous_synchronous}")
+            conn.exec_driver_sql(f"PRAGMA cache_size={previous_cache_size}")
+            # Restore search, facets and indexes even if the load failed, so a
+            # running app isn't left with stale tables and full scans
+            _rebuild_derived(engine, table)
+
+    elapsed = time.perf_counter() - started
+    print(f"Inserted {inserted} rows in {elapsed:.1f}s "
+          f"({inserted / elapsed if elapsed else 0:,.0f} rows/sec), skipped {skipped} invalid records")
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE import_progress SET finished = 1 WHERE source = :source"),
+            {'source': source}
+        )
+    return inserted
@@ -0,0 +1,117 @@
+"""
+In-process LRU cache with size and TTL bounds
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+class LRUCache:
+    """Thread-safe LRU map whose entries also expire after `ttl` seconds
+
+    Read-through callers take `version()` before loading from the database
+    and pass it to `put()`. If any invalidation happened in between, the put
+    is dropped, so a value loaded just before a write commits can't be cached
+    after that write's invalidation.
+
+    `max_size` bounds the summed `weigh(value)` of the entries; by default
+    every entry weighs 1, so it is an entry count.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None,
+                 weigh: Optional[Callable[[Any], int]] = None):
+        self.max_size = max(0, max_size)
+        self.ttl = ttl or None
+        self._weigh = weigh
+        self._weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def version(self) -> int:
+        """Invalidation counter to hand back to put()"""
+        return self._version
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+            expires_at, value, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, version: Optional[int] = None) -> bool:
+        """Store a value; returns False if `version` is stale or the cache is off"""
+        if not self.enabled:
+            return False
+        weight = self._weigh(value) if self._weigh else 1
+        if weight > self.max_size:
+            return False
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if version is not None and version != self._version:
+                return False
+            self._remove(key)
+            self._data[key] = (expires_at, value, weight)
+            self._weight += weight
+            while self._weight > self.max_size:
+                self._remove(next(iter(self._data)))
+                self._stats['evictions'] += 1
+        return True
+
+    def _remove(self, key: Hashable) -> bool:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self._weight -= entry[2]
+        return True
+
+    def invalidate(self, key: Hashable):
+        self.invalidate_many((key,))
+
+    def invalidate_many(self, keys: Iterable[Hashable]):
+        with self._lock:
+            self._version += 1
+            for key in keys:
+                if self._remove(key):
+                    self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._stats['invalidations'] += len(self._data)
+            self._data.clear()
+            self._weight = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._data)
+            stats['weight'] = self._weight
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['max_size'] = self.max_size
+        stats['ttl'] = self.ttl
+        return stats
@@ -0,0 +1,178 @@
+"""
+Incremental catalog sync against a full upstream feed
+
+    python catalog_sync.py feed.jsonl
+    python catalog_sync.py feed.csv --key sku --no-delete
+
+Upstream re-sends the whole catalog but only a few rows change, so every
+product remembers the feed key it came from (`external_id`) and a sha256 of
+its content as last synced (`content_hash`). The feed is streamed into a
+temporary staging table and diffed against `products` in SQL. Only new,
+changed and vanished rows are written, with one set-based statement each and
+all in one transaction, so readers see the old catalog or the new one and
+nothing in between. The FTS and facet triggers keep search and facets in step
+with the handful of rows touched.
+
+Products without an external_id (created through the API) are never
+deleted or updated by a sync. A feed record that has a key but fails
+validation is staged as keep-only: its product is neither updated nor deleted.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable
+from sqlalchemy import text
+
+from bulk_import import read_records, product_row
+
+SYNC_CHUNK_SIZE = int(os.environ.get('SYNC_CHUNK_SIZE', 10000))
+# A feed that would delete more than this share of synced products is
+# treated as truncated and rejected, unless forced
+SYNC_MAX_DELETE_FRACTION = float(os.environ.get('SYNC_MAX_DELETE_FRACTION', 0.5))
+
+CONTENT_COLUMNS = ('title', 'price', 'description', 'category', 'image',
+                   'rating_rate', 'rating_count')
+
+# Untyped columns store feed values exactly as bound, with no affinity
+# conversion. Keep-only rows (invalid records) have no content_hash.
+STAGING_TABLE = f"""CREATE TEMP TABLE sync_feed (
+    external_id TEXT PRIMARY KEY,
+    content_hash TEXT,
+    {', '.join(CONTENT_COLUMNS)},
+    rating
+)"""
+
+STAGE_ROW = f"""INSERT OR REPLACE INTO sync_feed
+    (external_id, content_hash, {', '.join(CONTENT_COLUMNS)}, rating)
+    VALUES (:external_id, :content_hash, {', '.join(f':{column}' for column in CONTENT_COLUMNS)}, :rating)"""
+
+# A valid record for the same key wins whichever comes first
+STAGE_KEEP = "INSERT OR IGNORE INTO sync_feed (external_id) VALUES (:external_id)"
+
+INSERT_NEW = f"""INSERT INTO products (external_id, content_hash, {', '.join(CONTENT_COLUMNS)}, rating)
+    SELECT f.external_id, f.content_hash, {', '.join(f'f.{column}' for column in CONTENT_COLUMNS)}, f.rating
+    FROM sync_feed f
+    WHERE f.content_hash IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM products p WHERE p.external_id = f.external_id)"""
+
+UPDATE_CHANGED = f"""UPDATE products
+    SET content_hash = f.content_hash,
+        {', '.join(f'{column} = f.{column}' for column in CONTENT_COLUMNS)},
+        rating = f.rating
+    FROM sync_feed f
+    WHERE products.external_id = f.external_id
+      AND f.content_hash IS NOT NULL
+      AND products.content_hash IS NOT f.content_hash"""
+
+VANISHED = """FROM products
+    WHERE external_id IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM sync_feed f WHERE f.external_id = products.external_id)"""
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """Stable sha256 of a product's synced content"""
+    payload = json.dumps([row[column] for column in CONTENT_COLUMNS], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def staged_rows(records: Iterable[Dict[str, Any]], key: str):
+    """Feed records as staging rows
+
+    Records without a key yield None; keyed records without a title or price
+    yield a keep-only row holding just the key.
+    """
+    for record in records:
+        external_id = record.get(key)
+        if external_id in (None, ''):
+            yield None
+            continue
+        row = product_row(record)
+        if row is None:
+            yield {'external_id': str(external_id)}
+            continue
+        row['external_id'] = str(external_id)
+        row['content_hash'] = content_hash(row)
+        row['rating'] = json.dumps(row['rating']) if row['rating'] is not None else None
+        yield row
+
+def sync_catalog(engine, records: Iterable[Dict[str, Any]], key: str = 'external_id',
+                 delete: bool = True, force: bool = False,
+                 chunk_size: int = SYNC_CHUNK_SIZE) -> Dict[str, int]:
+    """Apply a full feed to products; returns inserted/updated/deleted/unchanged/skipped counts"""
+    if engine.dialect.name != 'sqlite':
+        raise ValueError("Catalog sync only supports SQLite databases")
+
+    counts = {'received': 0, 'skipped': 0}
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS temp.sync_feed")
+        conn.exec_driver_sql(STAGING_TABLE)
+
+        rows = staged_rows(records, key)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            valid = [row for row in chunk if row is not None and 'content_hash' in row]
+            keep = [row for row in chunk if row is not None and 'content_hash' not in row]
+            counts['received'] += len(chunk)
+            counts['skipped'] += len(chunk) - len(valid)
+            if valid:
+                conn.execute(text(STAGE_ROW), valid)
+            if keep:
+                conn.execute(text(STAGE_KEEP), keep)
+
+        staged = conn.exec_driver_sql(
+            "SELECT COUNT(*) FROM sync_feed WHERE content_hash IS NOT NULL"
+        ).scalar()
+        synced = conn.exec_driver_sql(
+            "SELECT COUNT(*) FROM products WHERE external_id IS NOT NULL"
+        ).scalar()
+
+        counts['inserted'] = conn.exec_driver_sql(INSERT_NEW).rowcount
+        counts['updated'] = conn.exec_driver_sql(UPDATE_CHANGED).rowcount
+        counts['deleted'] = 0
+        if delete:
+            vanished = conn.exec_driver_sql(f"SELECT COUNT(*) {VANISHED}").scalar()
+            if vanished and not force and vanished > synced * SYNC_MAX_DELETE_FRACTION:
+                raise ValueError(
+                    f"Feed would delete {vanished} of {synced} synced products; "
+                    f"refusing (is the feed truncated?). Use --force to apply."
+                )
+            counts['deleted'] = conn.exec_driver_sql(f"DELETE {VANISHED}").rowcount
+
+        counts['unchanged'] = staged - counts['inserted'] - counts['updated']
+        conn.exec_driver_sql("DROP TABLE temp.sync_feed")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync products with a full JSONL or CSV feed")
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('jsonl', 'csv'),
+                        help='feed format (default: from the extension)')
+    parser.add_argument('--key', default='external_id',
+                        help='feed field holding the upstream product id')
+    parser.add_argument('--no-delete', dest='delete', action='store_false',
+                        help='keep products missing from the feed')
+    parser.add_argument('--force', action='store_true',
+                        help='apply even if the feed would delete most synced products')
+    args = parser.parse_args()
+
+    from app import engine, prepare_database
+    prepare_database()
+
+    started = time.perf_counter()
+    try:
+        counts = sync_catalog(engine, read_records(args.path, args.format), args.key,
+                              delete=args.delete, force=args.force)
+    except ValueError as e:
+        raise SystemExit(f"Sync aborted, nothing was changed: {e}")
+    elapsed = time.perf_counter() - started
+    print(f"Synced {counts['received']} feed records in {elapsed:.1f}s: "
+          f"{counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['deleted']} deleted, {counts['unchanged']} unchanged, "
+          f"{counts['skipped']} skipped")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Bounded thread pool for resolving root query fields concurrently
+
+graphql-core's default executor resolves `{ allProducts { ... } catalogFacets
+{ ... } productsConnection { ... } }` one root field after another. RootFieldPool runs each root
+field of a multi-field query on a shared, bounded pool instead; nested fields
+and mutations still resolve inline on the request thread, so only the
+expensive database round trips overlap. Root fields listed in `inline_fields`
+(the DataLoader-backed ones) also stay on the request thread, where their
+lookups keep sharing one batch.
+
+Pool threads get their own `scoped_session` session. `teardown` (normally
+`db_session.remove`) runs after every task, and DataLoader promises returned
+by a root resolver are settled on the pool thread before that, so no session
+outlives the task that opened it.
+
+The thread pool itself is created on first use in each process, so a pool
+built before a fork never hands work to threads that only exist in the parent.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+from graphql.execution.base import ResolveInfo
+from promise import Promise, is_thenable
+
+# 'threads' resolves root fields on the pool, 'sync' keeps graphql-core's default
+GRAPHQL_EXECUTOR = os.environ.get('GRAPHQL_EXECUTOR', 'threads').lower()
+GRAPHQL_MAX_WORKERS = int(os.environ.get('GRAPHQL_MAX_WORKERS', 4))
+
+class RootFieldPool:
+    """Thread pool shared by every request; hands out per-execution executors"""
+
+    def __init__(self, max_workers: int = GRAPHQL_MAX_WORKERS,
+                 teardown: Optional[Callable[[], None]] = None,
+                 inline_fields: Iterable[str] = ()):
+        self.max_workers = max_workers
+        self.teardown = teardown
+        self.inline_fields = frozenset(inline_fields)
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        """This process's thread pool, created on first use"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='graphql-field')
+                    self._pid = os.getpid()
+        return self._pool
+
+    def executor(self) -> 'RootFieldExecutor':
+        """Executor for one document execution (its pending tasks are its own)"""
+        return RootFieldExecutor(self)
+
+    def run(self, fn, args, kwargs):
+        """Resolve one root field on a pool thread, settling any loader promise"""
+        try:
+            result = fn(*args, **kwargs)
+            if is_thenable(result):
+                result = Promise.resolve(result).get()
+            return result
+        finally:
+            if self.teardown:
+                self.teardown()
+
+class RootFieldExecutor:
+    """graphql-core executor sending root query fields to a RootFieldPool
+
+    Results are handed back to the request thread in wait_until_finished(),
+    so everything downstream of a root field resolves on that thread.
+    """
+
+    def __init__(self, pool: RootFieldPool):
+        self.pool = pool
+        self.pending = []
+
+    def execute(self, fn, *args, **kwargs):
+        info = args[1] if len(args) > 1 else None
+        if not self.runs_concurrently(info):
+            return fn(*args, **kwargs)
+
+        promise = Promise()
+        future = self.pool.pool.submit(self.pool.run, fn, args, kwargs)
+        self.pending.append((future, promise))
+        return promise
+
+    def runs_concurrently(self, info) -> bool:
+        """Only root fields of queries selecting more than one of them"""
+        return (
+            isinstance(info, ResolveInfo)
+            and info.operation.operation == 'query'
+            and info.parent_type is info.schema.get_query_type()
+            and info.field_name not in self.pool.inline_fields
+            and len(info.operation.selection_set.selections) > 1
+        )
+
+    def wait_until_finished(self):
+        while self.pending:
+            pending, self.pending = self.pending, []
+            for future, promise in pending:
+                try:
+                    promise.do_resolve(future.result())
+                except Exception as e:
+                    promise.do_reject(e, traceback=e.__traceback__)
+
+    def clean(self):
+        self.pending = []
@@ -0,0 +1,85 @@
+"""
+Streaming catalog export as NDJSON or CSV
+
+The products table is read in keyset chunks (`WHERE id > last ORDER BY id
+LIMIT n`), and each chunk is encoded and handed to the response before the
+next one is read. Memory use depends on the chunk size, not on the catalog
+size. Each chunk is its own short read, so a long export never pins a WAL
+snapshot and the async writer's checkpoints keep working.
+"""
+
+import csv
+import io
+import os
+from typing import Iterator, Optional
+from sqlalchemy import select
+
+from responses import json_encode
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+# Largest chunk a client may ask for; each chunk is held in memory while written
+MAX_EXPORT_CHUNK_SIZE = int(os.environ.get('MAX_EXPORT_CHUNK_SIZE', 10000))
+
+EXPORT_COLUMNS = ('id', 'title', 'price', 'description', 'category', 'image',
+                  'rating_rate', 'rating_count')
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+def export_chunks(engine, table, chunk_size: int = EXPORT_CHUNK_SIZE,
+                  category: Optional[str] = None) -> Iterator[list]:
+    """Yield lists of up to `chunk_size` product rows in id order"""
+    columns = [table.c[name] for name in EXPORT_COLUMNS]
+    last_id = None
+    with engine.connect() as conn:
+        while True:
+            query = select(*columns).order_by(table.c.id).limit(chunk_size)
+            if category is not None:
+                query = query.where(table.c.category == category)
+            if last_id is not None:
+                query = query.where(table.c.id > last_id)
+
+            rows = conn.execute(query).fetchall()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1].id
+
+def ndjson_chunks(chunks) -> Iterator[bytes]:
+    """One JSON object per line, shaped like the GraphQL product type"""
+    for rows in chunks:
+        lines = []
+        for row in rows:
+            product = dict(row._mapping)
+            rate = product.pop('rating_rate')
+            count = product.pop('rating_count')
+            product['rating'] = (None if rate is None or count is None
+                                 else {'rate': rate, 'count': count})
+            line = json_encode(product)
+            lines.append(line if isinstance(line, bytes) else line.encode('utf-8'))
+        yield b'\n'.join(lines) + b'\n'
+
+def csv_chunks(chunks) -> Iterator[bytes]:
+    """Header row, then the export columns as they are stored"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def export_products(engine, table, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE,
+                    category: Optional[str] = None) -> Iterator[bytes]:
+    """Encoded export body for `export_format` ('ndjson' or 'csv')"""
+    chunks = export_chunks(engine, table, chunk_size, category)
+    if export_format == 'csv':
+        return csv_chunks(chunks)
+    return ndjson_chunks(chunks)
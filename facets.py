@@ -0,0 +1,286 @@
+"""
+Incrementally maintained catalog facets: per-category counts and averages
+plus a price histogram
+
+Triggers on `products` apply each insert, update and delete as a delta to
+the summary tables inside the writer's own transaction. That covers the
+AsyncProductDB batches and the ORM writes alike, and reading the facets
+costs O(categories + buckets) instead of a scan over every product.
+
+The same triggers bump `catalog_version`, a one-row counter shared by every
+process using the database, so a process can tell from one read whether
+anyone (another worker, catalog sync, an import) changed products.
+CatalogWatcher polls it from a background thread, so requests never pay for
+that read.
+"""
+
+import os
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy import MetaData, Table, Column, Integer, Float, String, text
+
+# Lower edges of the price histogram buckets; the last bucket is open-ended.
+# Changing them requires dropping the facet triggers so they are rebuilt.
+PRICE_BUCKET_EDGES = [0, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+# Kept out of Base.metadata so the model layer stays products-only
+facet_metadata = MetaData()
+
+# NULL categories are stored under '' so they can be upserted like the rest
+category_facets = Table(
+    'category_facets',
+    facet_metadata,
+    Column('category', String(100), primary_key=True),
+    Column('product_count', Integer, nullable=False, default=0),
+    Column('price_sum', Float, nullable=False, default=0),
+    Column('priced_count', Integer, nullable=False, default=0),
+    Column('rating_sum', Float, nullable=False, default=0),
+    Column('rated_count', Integer, nullable=False, default=0),
+)
+
+price_facets = Table(
+    'price_facets',
+    facet_metadata,
+    Column('bucket', Integer, primary_key=True),
+    Column('product_count', Integer, nullable=False, default=0),
+)
+
+catalog_version = Table(
+    'catalog_version',
+    facet_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False, default=0),
+)
+
+# Row 1 counts every product change; row 2 only deletions, which is all a
+# cache of existing ids needs to watch
+CATALOG_VERSION_QUERY = "SELECT version FROM catalog_version WHERE id = 1"
+DELETE_VERSION_QUERY = "SELECT version FROM catalog_version WHERE id = 2"
+BUMP_VERSION = "UPDATE catalog_version SET version = version + 1 WHERE id = 1;"
+BUMP_DELETE_VERSION = "UPDATE catalog_version SET version = version + 1 WHERE id = 2;"
+
+def _bucket_expression(price: str) -> str:
+    """SQL CASE mapping a price to its histogram bucket index"""
+    cases = ' '.join(
+        f"WHEN {price} >= {edge} THEN {index}"
+        for index, edge in reversed(list(enumerate(PRICE_BUCKET_EDGES)))
+    )
+    return f"CASE {cases} ELSE 0 END"
+
+def _apply_delta(row: str, sign: int) -> str:
+    """Statements adding (sign=1) or removing (sign=-1) one product row"""
+    return f"""
+        INSERT INTO category_facets
+            (category, product_count, price_sum, priced_count, rating_sum, rated_count)
+        VALUES (
+            COALESCE({row}.category, ''), {sign},
+            {sign} * COALESCE({row}.price, 0), {sign} * ({row}.price IS NOT NULL),
+            {sign} * COALESCE({row}.rating_rate, 0), {sign} * ({row}.rating_rate IS NOT NULL)
+        )
+        ON CONFLICT(category) DO UPDATE SET
+            product_count = product_count + excluded.product_count,
+            price_sum = price_sum + excluded.price_sum,
+            priced_count = priced_count + excluded.priced_count,
+            rating_sum = rating_sum + excluded.rating_sum,
+            rated_count = rated_count + excluded.rated_count;
+        DELETE FROM category_facets
+        WHERE category = COALESCE({row}.category, '') AND product_count <= 0;
+        INSERT INTO price_facets (bucket, product_count)
+        SELECT {_bucket_expression(f'{row}.price')}, {sign} WHERE {row}.price IS NOT NULL
+        ON CONFLICT(bucket) DO UPDATE SET product_count = product_count + excluded.product_count;
+        DELETE FROM price_facets WHERE product_count <= 0;"""
+
+TRIGGER_STATEMENTS = [
+    f"""CREATE TRIGGER IF NOT EXISTS category_facets_ai AFTER INSERT ON products BEGIN
+        {_apply_delta('new', 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS category_facets_ad AFTER DELETE ON products BEGIN
+        {_apply_delta('old', -1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS category_facets_au
+        AFTER UPDATE OF category, price, rating_rate ON products BEGIN
+        {_apply_delta('old', -1)}
+        {_apply_delta('new', 1)}
+    END""",
+    # One bump per changed row, on any column
+    f"""CREATE TRIGGER IF NOT EXISTS catalog_version_ai AFTER INSERT ON products BEGIN
+        {BUMP_VERSION}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS catalog_version_ad AFTER DELETE ON products BEGIN
+        {BUMP_VERSION}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS catalog_version_au AFTER UPDATE ON products BEGIN
+        {BUMP_VERSION}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS catalog_deletes_ad AFTER DELETE ON products BEGIN
+        {BUMP_DELETE_VERSION}
+    END""",
+]
+
+TRIGGER_NAMES = ['category_facets_ai', 'category_facets_ad', 'category_facets_au',
+                 'catalog_version_ai', 'catalog_version_ad', 'catalog_version_au',
+                 'catalog_deletes_ad']
+
+def rebuild_facets(conn):
+    """Recompute the summary tables from scratch with one pass over products"""
+    conn.execute(text("DELETE FROM category_facets"))
+    conn.execute(text("DELETE FROM price_facets"))
+    conn.execute(text(
+        """INSERT INTO category_facets
+               (category, product_count, price_sum, priced_count, rating_sum, rated_count)
+           SELECT COALESCE(category, ''), COUNT(*),
+                  COALESCE(SUM(price), 0), COUNT(price),
+                  COALESCE(SUM(rating_rate), 0), COUNT(rating_rate)
+           FROM products GROUP BY COALESCE(category, '')"""
+    ))
+    conn.execute(text(
+        f"""INSERT INTO price_facets (bucket, product_count)
+            SELECT {_bucket_expression('price')} AS bucket, COUNT(*)
+            FROM products WHERE price IS NOT NULL GROUP BY bucket"""
+    ))
+    # Rebuilds follow changes made with the triggers off (bulk import)
+    conn.execute(text("UPDATE catalog_version SET version = version + 1"))
+
+def ensure_facets(engine) -> bool:
+    """Create the summary tables and triggers, backfilling on first run
+
+    Returns False for non-SQLite databases, which get no facets.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    with engine.begin() as conn:
+        installed = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+            {'name': TRIGGER_NAMES[0]}
+        ).first()
+        facet_metadata.create_all(bind=conn)
+        conn.execute(text("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0), (2, 0)"))
+        for statement in TRIGGER_STATEMENTS:
+            conn.exec_driver_sql(statement)
+        if not installed:
+            rebuild_facets(conn)
+    return True
+
+def read_catalog_version(conn) -> int:
+    """Current shared catalog version (connection or session)"""
+    return conn.execute(text(CATALOG_VERSION_QUERY)).scalar() or 0
+
+class CatalogWatcher:
+    """Polls the catalog and delete versions on one long-lived connection
+
+    `on_change(version, delete_version)` runs on the watcher thread for the
+    first read and whenever either moves. Like the async writer, the thread
+    is started per process by start().
+    """
+
+    def __init__(self, engine, interval_ms: float, on_change: Callable[[int, int], None]):
+        self.engine = engine
+        self.interval = interval_ms / 1000
+        self.on_change = on_change
+        self._pid = None
+        self._start_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def start(self):
+        """Start polling in this process; a no-op if it already runs here"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._poll, daemon=True).start()
+            self._pid = os.getpid()
+
+    def _after_fork(self):
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _poll(self):
+        conn = None
+        versions = None
+        while True:
+            try:
+                if conn is None:
+                    conn = self.engine.raw_connection()
+                # No transaction is held open, so every read sees the latest commit
+                row = conn.cursor().execute(
+                    f"SELECT ({CATALOG_VERSION_QUERY}), ({DELETE_VERSION_QUERY})"
+                ).fetchone()
+                current = (row[0] or 0, row[1] or 0)
+                if current != versions:
+                    versions = current
+                    self.on_change(*versions)
+            except Exception as e:
+                print(f"Catalog watcher error: {e}")
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+            time.sleep(self.interval)
+
+def read_facets(session) -> dict:
+    """Category facets and price histogram straight from the summary tables"""
+    categories = [
+        {
+            'category': row.category or None,
+            'count': row.product_count,
+            'average_price': row.price_sum / row.priced_count if row.priced_count else None,
+            'average_rating': row.rating_sum / row.rated_count if row.rated_count else None,
+        }
+        for row in session.execute(
+            category_facets.select().order_by(category_facets.c.category)
+        )
+    ]
+
+    counts = dict(session.execute(price_facets.select()).fetchall())
+    histogram = [
+        {
+            'min': edge,
+            'max': PRICE_BUCKET_EDGES[index + 1] if index + 1 < len(PRICE_BUCKET_EDGES) else None,
+            'count': counts.get(index, 0),
+        }
+        for index, edge in enumerate(PRICE_BUCKET_EDGES)
+    ]
+    return {'categories': categories, 'price_histogram': histogram}
+
+def total_products(session) -> int:
+    """Catalog size from the maintained per-category counters"""
+    return session.execute(
+        text("SELECT COALESCE(SUM(product_count), 0) FROM category_facets")
+    ).scalar()
+
+def category_total(session, category) -> int:
+    """Products in one category, from its maintained counter"""
+    count = session.execute(
+        text("SELECT product_count FROM category_facets WHERE category = :category"),
+        {'category': category or ''}
+    ).scalar()
+    return count or 0
+
+def estimate_price_range(session, min_price=None, max_price=None) -> float:
+    """Approximate products priced within [min_price, max_price] from the histogram
+
+    Assumes prices are spread evenly inside each bucket; the open top bucket
+    is treated as ending at twice its lower edge.
+    """
+    counts = dict(session.execute(price_facets.select()).fetchall())
+    low = float('-inf') if min_price is None else min_price
+    high = float('inf') if max_price is None else max_price
+
+    estimate = 0.0
+    for index, edge in enumerate(PRICE_BUCKET_EDGES):
+        count = counts.get(index, 0)
+        if not count:
+            continue
+        upper = (PRICE_BUCKET_EDGES[index + 1] if index + 1 < len(PRICE_BUCKET_EDGES)
+                 else max(edge * 2, edge + 1))
+        overlap = min(high, upper) - max(low, edge)
+        if overlap > 0:
+            estimate += count * min(1.0, overlap / (upper - edge))
+    return estimate
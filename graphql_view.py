@@ -0,0 +1,149 @@
+"""
+GraphQL endpoint with a parsed-document cache, persisted queries and a
+pluggable executor
+
+Parsing and validating a document costs far more than executing most of our
+queries, and clients send the same few documents over and over. Documents are
+parsed and validated once per sha256 of their text and kept in an LRU.
+
+Persisted queries follow the Apollo "automatic persisted queries" protocol:
+the client sends `extensions.persistedQuery.sha256Hash` alone, and only
+includes the full `query` text after the server answers PersistedQueryNotFound.
+
+Executors come from an optional RootFieldPool (`executor.py`), one per
+execution. With `batch=True` a JSON array of operations runs in one request,
+up to `max_batch_size`.
+"""
+
+import hashlib
+import json
+import os
+from functools import partial
+from flask import request
+from flask_graphql import GraphQLView
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+from graphql.language.base import parse
+from graphql.validation import validate
+from graphql_server import HttpQueryError
+
+from cache import LRUCache
+
+DOCUMENT_CACHE_SIZE = int(os.environ.get('DOCUMENT_CACHE_SIZE', 1000))
+PERSISTED_QUERY_CACHE_SIZE = int(os.environ.get('PERSISTED_QUERY_CACHE_SIZE', 10000))
+# Most operations accepted in one batched (JSON array) request
+MAX_BATCH_SIZE = int(os.environ.get('GRAPHQL_MAX_BATCH_SIZE', 20))
+
+def query_hash(query: str) -> str:
+    """Hex sha256 of a document, as sent in persistedQuery.sha256Hash"""
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+def _invalid(errors, *args, **kwargs):
+    return ExecutionResult(errors=errors, invalid=True)
+
+class CachedDocumentBackend(GraphQLBackend):
+    """Parses and validates each distinct document once
+
+    Documents that fail validation are cached too, with their errors;
+    documents that fail to parse are not.
+    """
+
+    def __init__(self, max_size: int = DOCUMENT_CACHE_SIZE):
+        self.documents = LRUCache(max_size)
+
+    def document_from_string(self, schema, document_string):
+        key = (id(schema), query_hash(document_string))
+        document = self.documents.get(key)
+        if document is not None:
+            return document
+
+        document_ast = parse(document_string)
+        errors = validate(schema, document_ast)
+        document = GraphQLDocument(
+            schema=schema,
+            document_string=document_string,
+            document_ast=document_ast,
+            execute=(partial(_invalid, errors) if errors
+                     else partial(execute, schema, document_ast))
+        )
+        self.documents.put(key, document)
+        return document
+
+class ProductGraphQLView(GraphQLView):
+    """GraphQLView that resolves persisted query hashes to their documents
+
+    `persisted_queries` is an LRUCache and `executor_pool` a RootFieldPool,
+    both shared across requests, since Flask builds a new view instance for
+    every request.
+    """
+    persisted_queries = None
+    executor_pool = None
+    max_batch_size = MAX_BATCH_SIZE
+
+    def get_context(self):
+        # The request itself rather than the context-local proxy, so resolvers
+        # running on executor pool threads can still reach it
+        return request._get_current_object()
+
+    def get_executor(self):
+        if self.executor_pool is not None:
+            return self.executor_pool.executor()
+        return super().get_executor()
+
+    def parse_body(self):
+        data = super().parse_body()
+        if request.method.lower() == 'get' and 'extensions' in request.args:
+            data = dict(request.args)
+        if isinstance(data, list):
+            return self.check_batch(data)
+        return self.resolve_persisted_query(data)
+
+    def check_batch(self, data):
+        """Bound a batched request and resolve each operation's persisted query
+
+        The operations run in order on this request, sharing its DB session
+        and DataLoaders.
+        """
+        if not self.batch:
+            raise HttpQueryError(400, "Batch GraphQL requests are not enabled.")
+        if len(data) > self.max_batch_size:
+            raise HttpQueryError(
+                400, f"Batch of {len(data)} operations exceeds the limit of {self.max_batch_size}"
+            )
+        if not all(isinstance(entry, dict) for entry in data):
+            raise HttpQueryError(400, "Each operation in a batch must be a JSON object")
+        return [self.resolve_persisted_query(entry) for entry in data]
+
+    def resolve_persisted_query(self, data):
+        """Fill in `query` from the hash, or remember a newly sent query"""
+        if not isinstance(data, dict) or self.persisted_queries is None:
+            return data
+        extensions = data.get('extensions')
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpQueryError(400, "extensions must be a JSON object")
+        if not isinstance(extensions, dict) or not extensions.get('persistedQuery'):
+            return data
+
+        persisted = extensions['persistedQuery']
+        if not isinstance(persisted, dict):
+            raise HttpQueryError(400, "persistedQuery must be an object")
+
+        digest = persisted.get('sha256Hash')
+        if persisted.get('version') != 1 or not isinstance(digest, str):
+            raise HttpQueryError(400, "Unsupported persistedQuery version")
+
+        query = data.get('query')
+        if query:
+            if query_hash(query) != digest:
+                raise HttpQueryError(400, "provided sha does not match query")
+            self.persisted_queries.put(digest, query)
+            return data
+
+        query = self.persisted_queries.get(digest)
+        if query is None:
+            # Apollo clients retry with the full query on this exact message
+            raise HttpQueryError(200, "PersistedQueryNotFound")
+        return dict(data, query=query)
@@ -0,0 +1,122 @@
+"""
+In-memory index of existing product ids
+
+UpdateProduct used to run a primary key lookup on the request thread just to
+reject unknown ids. Product ids are dense integers, so a bitmap with one bit
+per id answers that from memory: a million products cost 125 KB. The bitmap
+stops at ID_INDEX_BITMAP_MAX_ID (16 MiB by default); the rare ids above it,
+such as imported ones, are kept in a set, so one huge id can't make the
+bitmap exhaust memory.
+
+The index is loaded once at startup and grows through the async writer's
+commit listener and the synchronous create paths. A miss is never trusted on
+its own: callers fall back to the database, which covers rows created by
+another process (bulk import, catalog sync). Products are never deleted
+through the API; when another process deletes some (catalog sync), the app
+rebuilds the index with rewarm().
+"""
+
+import os
+import threading
+from typing import Any, Dict, Iterable
+from sqlalchemy import select
+
+# Rows per fetch while loading ids at startup
+WARM_FETCH_SIZE = 50000
+
+# Ids from here up are kept in a set rather than the bitmap
+ID_INDEX_BITMAP_MAX_ID = int(os.environ.get('ID_INDEX_BITMAP_MAX_ID', 1 << 27))
+
+class ProductIdIndex:
+    """Growable bitmap of product ids; reads are lock-free, writes locked"""
+
+    def __init__(self, bitmap_max_id: int = ID_INDEX_BITMAP_MAX_ID):
+        self.bitmap_max_id = max(0, bitmap_max_id)
+        self._bits = bytearray()
+        self._sparse = set()
+        self._count = 0
+        self._max_id = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'fallback_hits': 0,
+            'rewarms': 0,
+        }
+
+    def warm(self, engine, table) -> int:
+        """Load every id in `table`; returns the number of ids indexed"""
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(
+                select(table.c.id)
+            )
+            while True:
+                rows = result.fetchmany(WARM_FETCH_SIZE)
+                if not rows:
+                    break
+                self.add_many(row[0] for row in rows)
+        return self._count
+
+    def rewarm(self, engine, table) -> int:
+        """Reload from `table` and swap the result in, dropping deleted ids
+
+        Lookups keep using the old index while the new one loads. Ids added
+        meanwhile may be lost; they are only misses, which fall back to the
+        database.
+        """
+        fresh = ProductIdIndex(self.bitmap_max_id)
+        fresh.warm(engine, table)
+        with self._lock:
+            self._bits, self._sparse = fresh._bits, fresh._sparse
+            self._count, self._max_id = fresh._count, fresh._max_id
+        self._stats['rewarms'] += 1
+        return self._count
+
+    def __contains__(self, product_id: int) -> bool:
+        if product_id >= self.bitmap_max_id:
+            found = product_id in self._sparse
+        else:
+            bits = self._bits
+            byte = product_id >> 3
+            found = 0 <= byte < len(bits) and bool(bits[byte] & (1 << (product_id & 7)))
+        self._stats['hits' if found else 'misses'] += 1
+        return found
+
+    def add(self, product_id: int):
+        self.add_many((product_id,))
+
+    def add_many(self, product_ids: Iterable[int]):
+        with self._lock:
+            for product_id in product_ids:
+                if product_id is None or product_id < 0:
+                    continue
+                if product_id >= self.bitmap_max_id:
+                    if product_id not in self._sparse:
+                        self._sparse.add(product_id)
+                        self._count += 1
+                        self._max_id = max(self._max_id, product_id)
+                    continue
+                byte = product_id >> 3
+                if byte >= len(self._bits):
+                    # Grow geometrically so sequential inserts stay amortized
+                    # O(1), never past the bitmap's limit
+                    size = min(max(byte + 1, len(self._bits) * 2),
+                               (self.bitmap_max_id + 7) >> 3)
+                    self._bits.extend(bytes(size - len(self._bits)))
+                mask = 1 << (product_id & 7)
+                if not self._bits[byte] & mask:
+                    self._bits[byte] |= mask
+                    self._count += 1
+                    self._max_id = max(self._max_id, product_id)
+
+    def record_fallback(self, found: int):
+        """Count ids a database check found after missing the index"""
+        self._stats['fallback_hits'] += found
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['size'] = self._count
+        stats['max_id'] = self._max_id
+        stats['memory_bytes'] = len(self._bits)
+        stats['sparse_ids'] = len(self._sparse)
+        return stats
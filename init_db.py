@@ -1,16 +1,21 @@
 """
 Initialize the database with some sample data for testing
 Run this after starting the app for the first time
+
+    python init_db.py                          # sample data
+    python init_db.py import products.jsonl    # bulk import (JSONL or CSV)
 """
 
-from app import db_session, Product
+import argparse
+from app import db_session, engine, Product, count_products, prepare_database
+from bulk_import import import_file, IMPORT_CHUNK_SIZE
 import random
 
 def init_sample_data():
     """Add some sample products to the database"""
     
     # Check if we already have data
-    existing = Product.query.count()
+    existing = count_products()
     if existing > 0:
         print(f"Database already has {existing} products. Skipping initialization.")
         return
@@ -107,7 +112,9 @@ def init_sample_data():
             description=product_data["description"],
             category=product_data["category"],
             image=product_data["image"],
-            rating=product_data["rating"]
+            rating=product_data["rating"],
+            rating_rate=product_data["rating"]["rate"],
+            rating_count=product_data["rating"]["count"]
         )
         db_session.add(product)
     
@@ -115,5 +122,31 @@ def init_sample_data():
     db_session.commit()
     print(f"Successfully added {len(products)} sample products to the database!")
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('sample', help='add the sample products (default)')
+    load = commands.add_parser('import', help='stream products from a JSONL or CSV file')
+    load.add_argument('path')
+    load.add_argument('--format', choices=('jsonl', 'csv'),
+                      help='file format (default: from the extension)')
+    load.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE,
+                      help='rows per insert transaction')
+    load.add_argument('--restart', action='store_true',
+                      help='ignore saved progress and read the file from the start')
+    load.add_argument('--force', action='store_true',
+                      help='start over even if an unfinished run already inserted rows')
+    args = parser.parse_args()
+    prepare_database()
+    
+    if args.command == 'import':
+        try:
+            import_file(engine, Product.__table__, args.path, args.format,
+                        args.chunk_size, args.restart, args.force)
+        except ValueError as e:
+            raise SystemExit(f"Import aborted: {e}")
+    else:
+        init_sample_data()
+
 if __name__ == "__main__":
-    init_sample_data()
+    main()
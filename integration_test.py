@@ -2,8 +2,11 @@
 Integration tests with verbose request/response logging and complete test data
 """
 
+import hashlib
 import requests
 import json
+import sqlite3
+import tempfile
 import time
 import sys
 import os
@@ -30,6 +33,433 @@ def log_request_response(mutation_or_query, response, data):
         print(json.dumps(data, indent=2))
         print("---------------\n")
 
+def make_products_db():
+    """Empty WAL database with the app's schema, for in-process tests"""
+    from sqlalchemy import create_engine
+    from app import Base
+    path = os.path.join(tempfile.mkdtemp(), 'products.db')
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    return path, engine
+
+def count_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+def test_write_queue_policies():
+    """Test block, reject and spill when the write queue is full (in-process)"""
+    from async_db import AsyncProductDB, WriteQueueFull
+    try:
+        if VERBOSE:
+            print("\n=== Testing Write Queue Policies ===")
+        
+        expected = {'reject': (True, 2), 'block': (True, 2), 'spill': (False, 3)}
+        for policy, (shed_expected, rows_expected) in expected.items():
+            path, _ = make_products_db()
+            db = AsyncProductDB(path, batch_size=1, batch_window_ms=0, queue_size=1,
+                                queue_policy=policy, queue_block_ms=50)
+            
+            # Hold the write lock so the worker stalls on its first batch
+            # and the queue (one slot) fills up behind it
+            lock = sqlite3.connect(path)
+            lock.execute("BEGIN IMMEDIATE")
+            db.create_product_async({'title': 'first', 'price': 1.0})
+            assert wait_for(db.write_queue.empty)
+            db.create_product_async({'title': 'second', 'price': 2.0})
+            try:
+                db.create_product_async({'title': 'third', 'price': 3.0})
+                shed = False
+            except WriteQueueFull:
+                shed = True
+            lock.rollback()
+            lock.close()
+            
+            assert shed == shed_expected, f"{policy}: shed={shed}"
+            assert wait_for(lambda: count_rows(path) == rows_expected), policy
+            stats = db.get_stats()
+            if policy == 'block':
+                assert stats['blocked'] == 1 and stats['rejected'] == 1
+            elif policy == 'reject':
+                assert stats['blocked'] == 0 and stats['rejected'] == 1
+            else:
+                assert stats['spilled'] == 1 and stats['rejected'] == 0
+                assert wait_for(lambda: db.get_stats()['spill_pending'] == 0)
+        
+        print("Write queue policies passed (block, reject, spill)")
+        
+    except Exception as e:
+        print(f"Write queue policies failed: {e}")
+        raise
+
+def test_write_queue_counts_rows():
+    """Test that the queue bound and batch size count bulk rows, not operations (in-process)"""
+    from async_db import AsyncProductDB, WriteQueueFull
+    try:
+        if VERBOSE:
+            print("\n=== Testing Write Queue Row Accounting ===")
+        
+        path, _ = make_products_db()
+        db = AsyncProductDB(path, batch_size=2, batch_window_ms=0, queue_size=3,
+                            queue_policy='reject')
+        
+        lock = sqlite3.connect(path)
+        lock.execute("BEGIN IMMEDIATE")
+        db.create_product_async({'title': 'first', 'price': 1.0})
+        assert wait_for(db.write_queue.empty)
+        db.create_products_async([{'title': f'bulk {i}', 'price': 2.0} for i in range(2)])
+        db.create_product_async({'title': 'single', 'price': 3.0})
+        stats = db.get_stats()
+        assert stats['queue_depth'] == 3 and stats['queued_operations'] == 2, stats
+        # One more row would pass the bound although only two operations are queued
+        try:
+            db.create_products_async([{'title': 'shed', 'price': 4.0}])
+            shed = False
+        except WriteQueueFull:
+            shed = True
+        assert shed
+        lock.rollback()
+        lock.close()
+        
+        assert wait_for(lambda: count_rows(path) == 4)
+        stats = db.get_stats()
+        # The single create didn't fit in the bulk create's two-row batch
+        assert stats['max_batch_size'] == 2 and stats['batches'] == 3, stats
+        assert stats['queue_depth'] == 0 and stats['rejected'] == 1
+        
+        print("Write queue row accounting passed (bulk rows count toward the bound)")
+        
+    except Exception as e:
+        print(f"Write queue row accounting failed: {e}")
+        raise
+
+def test_spill_recovery():
+    """Test replay of a spill file left behind with a truncated last line (in-process)"""
+    from async_db import AsyncProductDB
+    try:
+        if VERBOSE:
+            print("\n=== Testing Spill Recovery ===")
+        
+        path, _ = make_products_db()
+        # As left by a crash while appending, in the single-process file name
+        with open(f"{path}.spill.draining", 'w') as f:
+            f.write(json.dumps({'type': 'create', 'data': {'title': 'Recovered', 'price': 5.0}}) + "\n")
+            f.write('{"type": "create", "data": {"title": "Cut sh')
+        
+        db = AsyncProductDB(path, batch_window_ms=0)
+        db.start()
+        assert db.spill_path == f"{path}.{os.getpid()}.spill"
+        assert wait_for(lambda: count_rows(path) == 1)
+        assert db.worker_thread.is_alive()
+        assert db.get_stats()['spill_rejected'] == 1
+        assert os.path.exists(f"{db.spill_path}.rejected")
+        assert not os.path.exists(f"{path}.spill.draining")
+        
+        # The worker keeps going after the bad line
+        db.create_product_async({'title': 'After recovery', 'price': 6.0})
+        assert wait_for(lambda: count_rows(path) == 2)
+        
+        print("Spill recovery passed (1 write replayed, 1 truncated line set aside)")
+        
+    except Exception as e:
+        print(f"Spill recovery failed: {e}")
+        raise
+
+def test_catalog_sync():
+    """Test catalog sync counts, skipped records and the delete guard (in-process)"""
+    from catalog_sync import sync_catalog
+    try:
+        if VERBOSE:
+            print("\n=== Testing Catalog Sync ===")
+        
+        path, engine = make_products_db()
+        feed = [
+            {'external_id': 'a', 'title': 'Keyboard', 'price': 49.0, 'category': 'Accessories'},
+            {'external_id': 'b', 'title': 'Mouse', 'price': 19.0, 'category': 'Accessories'},
+            {'external_id': 'c', 'title': 'Monitor', 'price': 199.0, 'category': 'Displays'},
+            {'external_id': 'd', 'title': 'Webcam', 'price': 59.0, 'category': 'Accessories'},
+            {'title': 'No key', 'price': 1.0},
+        ]
+        counts = sync_catalog(engine, feed)
+        assert (counts['inserted'], counts['skipped']) == (4, 1), counts
+        
+        def products():
+            with sqlite3.connect(path) as conn:
+                return dict(conn.execute("SELECT external_id, price FROM products"))
+        
+        # a unchanged, b invalid (kept), c changed, d vanished, e new
+        feed = [
+            feed[0],
+            {'external_id': 'b', 'title': 'Mouse', 'price': ''},
+            {'external_id': 'c', 'title': 'Monitor', 'price': 179.0, 'category': 'Displays'},
+            {'external_id': 'e', 'title': 'Dock', 'price': 99.0, 'category': 'Accessories'},
+        ]
+        counts = sync_catalog(engine, feed)
+        expected = {'received': 4, 'skipped': 1, 'inserted': 1, 'updated': 1,
+                    'deleted': 1, 'unchanged': 1}
+        assert counts == expected, counts
+        assert products() == {'a': 49.0, 'b': 19.0, 'c': 179.0, 'e': 99.0}
+        
+        # Dropping three of four synced products looks like a truncated feed
+        try:
+            sync_catalog(engine, feed[:1])
+            raise AssertionError("truncated feed was applied")
+        except ValueError:
+            pass
+        assert len(products()) == 4
+        counts = sync_catalog(engine, feed[:1], force=True)
+        assert counts['deleted'] == 3 and products() == {'a': 49.0}
+        
+        print("Catalog sync passed (insert, update, keep, delete and guard)")
+        
+    except Exception as e:
+        print(f"Catalog sync failed: {e}")
+        raise
+
+def test_batch_failure_isolation():
+    """Test that one bad write doesn't fail the rest of its group commit (in-process)"""
+    from async_db import AsyncProductDB
+    try:
+        if VERBOSE:
+            print("\n=== Testing Batch Failure Isolation ===")
+        
+        path, _ = make_products_db()
+        db = AsyncProductDB(path, batch_window_ms=0)
+        
+        # Queue all three while the writer is stalled so they share one batch
+        lock = sqlite3.connect(path)
+        lock.execute("BEGIN IMMEDIATE")
+        db.create_product_async({'title': 'first', 'price': 1.0})
+        assert wait_for(db.write_queue.empty)
+        db.create_product_async({'title': 'second', 'price': 2.0})
+        db.create_product_async({'title': {'not': 'storable'}, 'price': 3.0})
+        db.create_product_async({'title': 'third', 'price': 4.0})
+        lock.rollback()
+        lock.close()
+        
+        assert wait_for(lambda: count_rows(path) == 3)
+        assert wait_for(lambda: db.get_stats()['failed_operations'] == 1)
+        stats = db.get_stats()
+        assert stats['split_batches'] == 1 and stats['reconnects'] == 0, stats
+        
+        print("Batch failure isolation passed (1 bad write failed alone)")
+        
+    except Exception as e:
+        print(f"Batch failure isolation failed: {e}")
+        raise
+
+def test_write_coalescing():
+    """Test that queued updates to one product flush as a single UPDATE (in-process)"""
+    from async_db import AsyncProductDB
+    try:
+        if VERBOSE:
+            print("\n=== Testing Write Coalescing ===")
+        
+        path, _ = make_products_db()
+        with sqlite3.connect(path) as conn:
+            conn.execute("INSERT INTO products (id, title, price) VALUES (1, 'original', 1.0)")
+        db = AsyncProductDB(path, batch_window_ms=0)
+        updates = [
+            {'type': 'update', 'id': 1, 'data': {'title': 'first', 'price': 2.0}},
+            {'type': 'update', 'id': 1, 'data': {'price': 3.0}},
+            {'type': 'update_many', 'data': [(1, {'title': 'last'})]},
+            {'type': 'update', 'id': 1, 'data': {'price': 4.0}},
+        ]
+        
+        plan, product_ids = db._plan_batch(updates)
+        assert len(plan) == 1 and plan[0][1] == [('last', 4.0, 1)], plan
+        assert product_ids == {1}
+        coalesced = db.get_stats()['coalesced']
+        
+        # Queue the updates while the writer is stalled so they share one batch
+        lock = sqlite3.connect(path)
+        lock.execute("BEGIN IMMEDIATE")
+        db.create_product_async({'title': 'other', 'price': 9.0})
+        assert wait_for(db.write_queue.empty)
+        db.update_product_async(1, {'title': 'first', 'price': 2.0})
+        db.update_product_async(1, {'price': 3.0})
+        db.update_products_async([(1, {'title': 'last'})])
+        db.update_product_async(1, {'price': 4.0})
+        lock.rollback()
+        lock.close()
+        
+        assert wait_for(lambda: count_rows(path) == 2)
+        assert wait_for(lambda: db.get_stats()['coalesced'] == coalesced + 3), db.get_stats()
+        with sqlite3.connect(path) as conn:
+            row = conn.execute("SELECT title, price FROM products WHERE id = 1").fetchone()
+        assert row == ('last', 4.0), row
+        
+        print("Write coalescing passed (4 updates to one product, 1 UPDATE)")
+        
+    except Exception as e:
+        print(f"Write coalescing failed: {e}")
+        raise
+
+def test_partial_rating_update():
+    """Test that updating one rating column keeps the legacy rating JSON in step (in-process)"""
+    from async_db import AsyncProductDB
+    from app import build_product_updates
+    try:
+        if VERBOSE:
+            print("\n=== Testing Partial Rating Update ===")
+        
+        path, _ = make_products_db()
+        with sqlite3.connect(path) as conn:
+            conn.execute("""INSERT INTO products (id, title, price, rating, rating_rate, rating_count)
+                            VALUES (1, 'rated', 1.0, '{"rate": 4.0, "count": 10}', 4.0, 10)""")
+        db = AsyncProductDB(path, batch_window_ms=0)
+        
+        def rating():
+            with sqlite3.connect(path) as conn:
+                value = conn.execute("SELECT rating FROM products WHERE id = 1").fetchone()[0]
+            return json.loads(value) if value is not None else None
+        
+        db.update_product_async(1, build_product_updates(dict(rating_rate=4.5)))
+        assert wait_for(lambda: rating() == {'rate': 4.5, 'count': 10}), rating()
+        db.update_products_async([(1, build_product_updates(dict(rating_count=11)))])
+        assert wait_for(lambda: rating() == {'rate': 4.5, 'count': 11}), rating()
+        db.update_product_async(1, build_product_updates(dict(rating_rate=None)))
+        assert wait_for(lambda: rating() is None), rating()
+        
+        print("Partial rating update passed (legacy rating JSON follows the columns)")
+        
+    except Exception as e:
+        print(f"Partial rating update failed: {e}")
+        raise
+
+def test_id_index_follows_deletes():
+    """Test that a delete by another process drops the id from the index (in-process)"""
+    from facets import ensure_facets, CatalogWatcher
+    from id_index import ProductIdIndex
+    from app import Product
+    try:
+        if VERBOSE:
+            print("\n=== Testing Id Index After Foreign Deletes ===")
+        
+        path, engine = make_products_db()
+        ensure_facets(engine)
+        with sqlite3.connect(path) as conn:
+            conn.executemany("INSERT INTO products (id, title) VALUES (?, 'kept')", [(1,), (2,), (3,)])
+        index = ProductIdIndex()
+        index.warm(engine, Product.__table__)
+        assert 2 in index
+        
+        seen = []
+        def changed(version, delete_version):
+            if seen and delete_version > seen[-1]:
+                index.rewarm(engine, Product.__table__)
+            seen.append(delete_version)
+        CatalogWatcher(engine, 20, changed).start()
+        assert wait_for(lambda: seen)
+        
+        # An update only moves the catalog version, not the delete version
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE products SET title = 'changed' WHERE id = 1")
+        with sqlite3.connect(path) as conn:
+            conn.execute("DELETE FROM products WHERE id = 2")
+        assert wait_for(lambda: 2 not in index)
+        assert 1 in index and 3 in index
+        assert index.stats()['rewarms'] == 1, index.stats()
+        
+        print("Id index follows deletes passed (deleted id dropped after one rewarm)")
+        
+    except Exception as e:
+        print(f"Id index follows deletes failed: {e}")
+        raise
+
+def test_bulk_import():
+    """Test JSONL/CSV import, resume, restart refusal and rebuild after a failed load (in-process)"""
+    from bulk_import import import_file
+    from facets import TRIGGER_NAMES as FACET_TRIGGERS
+    from search_index import TRIGGER_NAMES as SEARCH_TRIGGERS, FTS_TABLE
+    from app import Product
+    try:
+        if VERBOSE:
+            print("\n=== Testing Bulk Import ===")
+        
+        table = Product.__table__
+        path, engine = make_products_db()
+        directory = os.path.dirname(path)
+        
+        jsonl = os.path.join(directory, 'products.jsonl')
+        with open(jsonl, 'w') as f:
+            f.write(json.dumps({'title': 'Imported Kettle', 'price': 30, 'category': 'Kitchen',
+                                'rating': {'rate': 4.2, 'count': 12}}) + "\n")
+            f.write(json.dumps({'title': 'Imported Toaster', 'price': 45.5, 'category': 'Kitchen'}) + "\n")
+            f.write("not json\n")
+            f.write(json.dumps({'title': 'No price'}) + "\n")
+        assert import_file(engine, table, jsonl) == 2
+        assert import_file(engine, table, jsonl) == 0  # already finished
+        
+        csv_path = os.path.join(directory, 'products.csv')
+        with open(csv_path, 'w') as f:
+            f.write("title,price,category,rating_rate,rating_count\n")
+            f.write("Imported Blender,80,Kitchen,4.5,30\n")
+            f.write("Imported Grinder,25,Kitchen,,\n")
+        assert import_file(engine, table, csv_path) == 2
+        assert count_rows(path) == 4
+        
+        # Chunks of two; the third chunk hits an id that already exists
+        with sqlite3.connect(path) as conn:
+            conn.execute("INSERT INTO products (id, title, price) VALUES (100, 'Existing', 1.0)")
+        partial = os.path.join(directory, 'partial.jsonl')
+        with open(partial, 'w') as f:
+            for i in range(6):
+                record = {'title': f'Resumable Widget {i}', 'price': 10 + i}
+                if i == 4:
+                    record['id'] = 100
+                f.write(json.dumps(record) + "\n")
+        try:
+            import_file(engine, table, partial, chunk_size=2)
+            failed = False
+        except Exception:
+            failed = True
+        assert failed
+        assert count_rows(path) == 5 + 4
+        
+        # Triggers, indexes and the search index are back despite the failure
+        with sqlite3.connect(path) as conn:
+            names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+            matches = conn.execute(
+                f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH 'resumable'"
+            ).fetchone()[0]
+            categories = conn.execute("SELECT SUM(product_count) FROM category_facets").fetchone()[0]
+        assert set(SEARCH_TRIGGERS + FACET_TRIGGERS) <= names
+        assert {index.name for index in table.indexes} <= names
+        assert matches == 4 and categories == 9, (matches, categories)
+        
+        # Starting the unfinished run over would insert its four rows again
+        try:
+            import_file(engine, table, partial, chunk_size=2, restart=True)
+            refused = False
+        except ValueError:
+            refused = True
+        assert refused
+        
+        # Clear the conflict and resume: only the last two records are read
+        with sqlite3.connect(path) as conn:
+            conn.execute("DELETE FROM products WHERE id = 100")
+        assert import_file(engine, table, partial, chunk_size=2) == 2
+        with sqlite3.connect(path) as conn:
+            titles = [row[0] for row in conn.execute(
+                "SELECT title FROM products WHERE title LIKE 'Resumable%' ORDER BY title")]
+        assert titles == [f'Resumable Widget {i}' for i in range(6)], titles
+        
+        print("Bulk import passed (JSONL, CSV, resume, restart refused, rebuilt after failure)")
+        
+    except Exception as e:
+        print(f"Bulk import failed: {e}")
+        raise
+
 def test_health_check():
     """Test health endpoint"""
     try:
@@ -50,6 +480,337 @@ def test_health_check():
         print(f"Health check failed: {e}")
         raise
 
+def test_browse_filters():
+    """Test category / price filters with server-side sorting"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Browse Filters ===")
+        
+        query = '''
+        query {
+            allProducts(category: "Gaming Peripherals", minPrice: 100, maxPrice: 200, orderBy: PRICE_DESC) {
+                title
+                price
+                category
+            }
+        }
+        '''
+        
+        response = requests.post(GRAPHQL_URL, json={'query': query})
+        data = response.json()
+        
+        log_request_response(query, response, data)
+        
+        assert response.status_code == 200
+        products = data['data']['allProducts']
+        prices = [p['price'] for p in products]
+        
+        assert len(products) >= 2
+        assert all(p['category'] == 'Gaming Peripherals' for p in products)
+        assert all(100 <= price <= 200 for price in prices)
+        assert prices == sorted(prices, reverse=True)
+        print(f"Browse filters passed ({len(products)} products, sorted by price)")
+        
+    except Exception as e:
+        print(f"Browse filters failed: {e}")
+        raise
+
+def test_catalog_facets():
+    """Test category facets and price histogram"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Catalog Facets ===")
+        
+        query = '''
+        query {
+            catalogFacets {
+                categories {
+                    category
+                    count
+                    averagePrice
+                    averageRating
+                }
+                priceHistogram {
+                    min
+                    max
+                    count
+                }
+            }
+        }
+        '''
+        
+        response = requests.post(GRAPHQL_URL, json={'query': query})
+        data = response.json()
+        
+        log_request_response(query, response, data)
+        
+        assert response.status_code == 200
+        facets = data['data']['catalogFacets']
+        products = requests.post(GRAPHQL_URL, json={'query': '{ allProducts { id } }'}).json()
+        total = len(products['data']['allProducts'])
+        
+        assert sum(c['count'] for c in facets['categories']) == total
+        assert sum(b['count'] for b in facets['priceHistogram']) == total
+        count = requests.post(GRAPHQL_URL, json={'query': '{ allProductsCount }'}).json()
+        assert count['data']['allProductsCount'] == total
+        gaming = [c for c in facets['categories'] if c['category'] == 'Gaming Peripherals']
+        assert gaming and gaming[0]['count'] >= 2
+        print(f"Catalog facets passed ({len(facets['categories'])} categories, {total} products)")
+        
+    except Exception as e:
+        print(f"Catalog facets failed: {e}")
+        raise
+
+def test_cursor_pagination():
+    """Test keyset pagination walks every product exactly once, in each direction"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Cursor Pagination ===")
+        
+        # Unrated products sort in their own NULL section; make sure there are some
+        mutation = '''
+        mutation {
+            createProductsSync(items: [
+                {title: "Unrated Cable A", price: 5.0, category: "Cursor Test"},
+                {title: "Unrated Cable B", price: 5.0, category: "Cursor Test"},
+                {title: "Unrated Cable C", price: 6.0, category: "Cursor Test"}
+            ]) {
+                ids
+            }
+        }
+        '''
+        response = requests.post(GRAPHQL_URL, json={'query': mutation})
+        assert len(response.json()['data']['createProductsSync']['ids']) == 3
+        
+        query = '''
+        query Page($after: String, $orderBy: ProductOrder) {
+            productsConnection(first: 2, after: $after, orderBy: $orderBy) {
+                totalCount
+                edges {
+                    cursor
+                    node {
+                        id
+                        price
+                        ratingRate
+                    }
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+        '''
+        
+        def walk(order_by):
+            seen = []
+            after = None
+            while True:
+                variables = {'after': after, 'orderBy': order_by}
+                response = requests.post(GRAPHQL_URL, json={'query': query, 'variables': variables})
+                data = response.json()
+                
+                log_request_response(query, response, data)
+                
+                assert response.status_code == 200, data
+                connection = data['data']['productsConnection']
+                seen.extend(edge['node'] for edge in connection['edges'])
+                if not connection['pageInfo']['hasNextPage']:
+                    break
+                after = connection['pageInfo']['endCursor']
+            # Node ids are GraphQL IDs (strings); compare them as numbers
+            for p in seen:
+                p['id'] = int(p['id'])
+            ids = [p['id'] for p in seen]
+            assert len(ids) == len(set(ids))
+            assert connection['totalCount'] == len(ids)
+            return seen
+        
+        seen = walk('PRICE_ASC')
+        assert [(p['price'], p['id']) for p in seen] == sorted((p['price'], p['id']) for p in seen)
+        
+        seen = walk('PRICE_DESC')
+        assert [(p['price'], p['id']) for p in seen] == sorted(((p['price'], p['id']) for p in seen), reverse=True)
+        
+        # NULLs come first ascending and last descending, ordered by id
+        for order_by, descending in (('RATING_ASC', False), ('RATING_DESC', True)):
+            seen = walk(order_by)
+            unrated = [p['id'] for p in seen if p['ratingRate'] is None]
+            rated = [(p['ratingRate'], p['id']) for p in seen if p['ratingRate'] is not None]
+            assert len(unrated) >= 3
+            assert unrated == sorted(unrated, reverse=descending)
+            assert rated == sorted(rated, reverse=descending)
+            order = [p['ratingRate'] is None for p in seen]
+            assert order == sorted(order, reverse=not descending), order_by
+        
+        print(f"Cursor pagination passed ({len(seen)} products by price and rating, both directions)")
+        
+    except Exception as e:
+        print(f"Cursor pagination failed: {e}")
+        raise
+
+def test_bulk_mutations():
+    """Test bulk create (sync and async) and bulk update"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Bulk Mutations ===")
+        
+        mutation = '''
+        mutation Bulk($items: [ProductInput!]!) {
+            createProductsSync(items: $items) {
+                ids
+            }
+        }
+        '''
+        items = [
+            {"title": "Anker USB-C Hub", "price": 49.99, "category": "Accessories",
+             "ratingRate": 4.4, "ratingCount": 1200},
+            {"title": "Samsung T7 SSD 1TB", "price": 89.99, "category": "Storage",
+             "ratingRate": 4.7, "ratingCount": 5400}
+        ]
+        
+        response = requests.post(GRAPHQL_URL, json={'query': mutation, 'variables': {'items': items}})
+        data = response.json()
+        
+        log_request_response(mutation, response, data)
+        
+        assert response.status_code == 200
+        ids = data['data']['createProductsSync']['ids']
+        assert len(ids) == 2 and ids[0] < ids[1]
+        
+        update = '''
+        mutation BulkUpdate($items: [ProductUpdateInput!]!) {
+            updateProducts(items: $items) {
+                success
+                count
+            }
+        }
+        '''
+        updates = [{"productId": product_id, "price": 39.99} for product_id in ids]
+        
+        response = requests.post(GRAPHQL_URL, json={'query': update, 'variables': {'items': updates}})
+        data = response.json()
+        
+        log_request_response(update, response, data)
+        
+        assert data['data']['updateProducts']['success'] == True
+        assert data['data']['updateProducts']['count'] == 2
+        
+        create = '''
+        mutation BulkCreate($items: [ProductInput!]!) {
+            createProducts(items: $items) {
+                success
+                count
+            }
+        }
+        '''
+        response = requests.post(GRAPHQL_URL, json={'query': create, 'variables': {'items': items}})
+        data = response.json()
+        
+        log_request_response(create, response, data)
+        
+        assert data['data']['createProducts']['success'] == True
+        
+        time.sleep(1)
+        
+        verify = f'''
+        query {{
+            product(productId: {ids[1]}) {{
+                price
+            }}
+        }}
+        '''
+        verify_data = requests.post(GRAPHQL_URL, json={'query': verify}).json()
+        assert verify_data['data']['product']['price'] == 39.99
+        
+        print(f"Bulk mutations passed (IDs: {ids})")
+        
+    except Exception as e:
+        print(f"Bulk mutations failed: {e}")
+        raise
+
+def test_product_id_index():
+    """Test that async-created products join the id index and can be updated"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Product Id Index ===")
+        
+        before = requests.get(f"{BASE_URL}/stats").json()['product_id_index']
+        
+        mutation = '''
+        mutation {
+            createProduct(title: "Logitech MX Master 3S", price: 99.99, category: "Accessories") {
+                success
+            }
+        }
+        '''
+        response = requests.post(GRAPHQL_URL, json={'query': mutation})
+        data = response.json()
+        
+        log_request_response(mutation, response, data)
+        
+        assert data['data']['createProduct']['success'] == True
+        time.sleep(1)
+        
+        after = requests.get(f"{BASE_URL}/stats").json()['product_id_index']
+        assert after['size'] == before['size'] + 1
+        new_id = after['max_id']
+        
+        update = '''
+        mutation Update($id: Int!) {
+            updateProduct(productId: $id, price: 89.99) {
+                success
+                message
+            }
+        }
+        '''
+        for product_id, expected in ((new_id, True), (10 ** 9, False)):
+            response = requests.post(GRAPHQL_URL, json={'query': update, 'variables': {'id': product_id}})
+            data = response.json()
+            log_request_response(update, response, data)
+            assert data['data']['updateProduct']['success'] == expected
+        
+        stats = requests.get(f"{BASE_URL}/stats").json()['product_id_index']
+        assert stats['hits'] > after['hits']
+        
+        # An id far past the bitmap goes to the sparse set, not a huge bitmap
+        from id_index import ProductIdIndex
+        index = ProductIdIndex(bitmap_max_id=1024)
+        index.add_many([1, 2, 2 ** 40])
+        assert 2 ** 40 in index and 2 in index and 3 not in index and 2 ** 40 + 1 not in index
+        assert index.stats()['memory_bytes'] <= 128 and index.stats()['sparse_ids'] == 1
+        
+        print(f"Product id index passed (new product {new_id}, {stats['size']} ids in {stats['memory_bytes']} bytes)")
+        
+    except Exception as e:
+        print(f"Product id index failed: {e}")
+        raise
+
+def test_stats_endpoint():
+    """Test write pipeline stats endpoint"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Stats Endpoint ===")
+        
+        response = requests.get(f"{BASE_URL}/stats")
+        data = response.json()
+        
+        if VERBOSE:
+            print(f"GET {BASE_URL}/stats")
+            print(f"Response: {json.dumps(data, indent=2)}")
+        
+        assert response.status_code == 200
+        writer = data['async_writer']
+        assert writer['batch_size'] >= 1
+        assert writer['commits'] <= writer['operations']
+        startup = data['startup']
+        assert startup['import_ms'] > 0 and startup['create_app_ms'] is not None
+        print(f"Stats endpoint passed ({writer['commits']} commits for {writer['operations']} writes, "
+              f"started in {startup['import_ms'] + startup['create_app_ms']:.0f}ms)")
+    except Exception as e:
+        print(f"Stats endpoint failed: {e}")
+        raise
+
 def test_async_create_product():
     """Test async product creation with full data"""
     try:
@@ -215,6 +976,75 @@ def test_get_product_by_id(product_id):
         print(f"Get product by ID failed: {e}")
         raise
 
+def test_batched_product_lookups(product_id):
+    """Test several aliased product lookups in one document"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Batched Product Lookups ===")
+        
+        query = f'''
+        query {{
+            first: product(productId: {product_id}) {{
+                id
+                title
+            }}
+            again: product(productId: {product_id}) {{
+                id
+            }}
+            missing: product(productId: 999999999) {{
+                id
+            }}
+        }}
+        '''
+        
+        response = requests.post(GRAPHQL_URL, json={'query': query})
+        data = response.json()
+        
+        log_request_response(query, response, data)
+        
+        assert response.status_code == 200
+        assert data['data']['first']['id'] == product_id
+        assert data['data']['again']['id'] == product_id
+        assert data['data']['missing'] is None
+        
+        # In-process: distinct ids, product cache off, count the SELECTs
+        from types import SimpleNamespace
+        from sqlalchemy import event
+        import app
+        path, engine = make_products_db()
+        with sqlite3.connect(path) as conn:
+            conn.executemany("INSERT INTO products (id, title, price) VALUES (?, ?, 1.0)",
+                             [(1, 'one'), (2, 'two'), (3, 'three')])
+        statements = []
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+        cache_size = app.product_cache.max_size
+        app.product_cache.max_size = 0
+        app.db_session.remove()
+        app.db_session.configure(bind=engine)
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            result = app.schema.execute(
+                '{ a: product(productId: 1) { id title } b: product(productId: 2) { id } '
+                'c: product(productId: 3) { id } d: product(productId: 999999999) { id } }',
+                context_value=SimpleNamespace()
+            )
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+            app.db_session.remove()
+            app.db_session.configure(bind=app.engine)
+            app.product_cache.max_size = cache_size
+        assert result.errors is None, result.errors
+        assert [result.data[alias] and result.data[alias]['id'] for alias in 'abcd'] == ['1', '2', '3', None]
+        selects = [statement for statement in statements if 'FROM products' in statement]
+        assert len(selects) == 1 and 'IN (' in selects[0], selects
+        
+        print("Batched product lookups passed (4 lookups, 1 query)")
+        
+    except Exception as e:
+        print(f"Batched product lookups failed: {e}")
+        raise
+
 def test_async_update_product(product_id):
     """Test async  update with full data"""
     try:
@@ -281,6 +1111,290 @@ def test_async_update_product(product_id):
         print(f"Async update failed: {e}")
         raise
 
+def test_product_cache(product_id):
+    """Test cached product reads stay fresh after an async update commits"""
+    try:
+        if VERBOSE:
+            print(f"\n=== Testing Product Cache ({product_id}) ===")
+        
+        query = f'''
+        query {{
+            product(productId: {product_id}) {{
+                id
+                title
+                rating
+            }}
+        }}
+        '''
+        
+        before = requests.get(f"{BASE_URL}/stats").json()['product_cache']
+        for _ in range(2):
+            response = requests.post(GRAPHQL_URL, json={'query': query})
+            data = response.json()
+            log_request_response(query, response, data)
+            assert response.status_code == 200
+            assert data['data']['product']['title'] == 'Sony WH-1000XM5 (Updated)'
+        after = requests.get(f"{BASE_URL}/stats").json()['product_cache']
+        assert after['hits'] > before['hits']
+        
+        mutation = f'''
+        mutation {{
+            updateProduct(productId: {product_id}, title: "Sony WH-1000XM5 (Cached)") {{
+                success
+            }}
+        }}
+        '''
+        response = requests.post(GRAPHQL_URL, json={'query': mutation})
+        assert response.json()['data']['updateProduct']['success'] == True
+        time.sleep(1)
+        
+        response = requests.post(GRAPHQL_URL, json={'query': query})
+        data = response.json()
+        log_request_response(query, response, data)
+        assert data['data']['product']['title'] == 'Sony WH-1000XM5 (Cached)'
+        assert json.loads(data['data']['product']['rating'])['rate'] == 4.9
+        
+        print(f"Product cache passed ({after['hits']} hits, {after['misses']} misses)")
+        
+    except Exception as e:
+        print(f"Product cache failed: {e}")
+        raise
+
+def test_listing_cache():
+    """Test repeated listings are cached and refreshed by the next commit"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Listing Cache ===")
+        
+        query = '''
+        query {
+            allProducts(category: "Listing Cache", orderBy: PRICE_ASC) {
+                id
+                title
+            }
+        }
+        '''
+        
+        before = requests.get(f"{BASE_URL}/stats").json()['listing_cache']
+        for _ in range(2):
+            response = requests.post(GRAPHQL_URL, json={'query': query})
+            data = response.json()
+            log_request_response(query, response, data)
+            assert response.status_code == 200
+            assert data['data']['allProducts'] == []
+        after = requests.get(f"{BASE_URL}/stats").json()['listing_cache']
+        assert after['hits'] > before['hits']
+        # Empty results still count against LISTING_CACHE_ROWS
+        assert after['weight'] >= after['size'] > 0
+        
+        mutation = '''
+        mutation {
+            createProductSync(title: "Cached Listing Lamp", price: 19.99, category: "Listing Cache") {
+                product {
+                    id
+                }
+            }
+        }
+        '''
+        response = requests.post(GRAPHQL_URL, json={'query': mutation})
+        product_id = response.json()['data']['createProductSync']['product']['id']
+        
+        response = requests.post(GRAPHQL_URL, json={'query': query})
+        data = response.json()
+        log_request_response(query, response, data)
+        assert [product['id'] for product in data['data']['allProducts']] == [product_id]
+        
+        print(f"Listing cache passed ({after['hits']} hits, {after['misses']} misses)")
+        
+    except Exception as e:
+        print(f"Listing cache failed: {e}")
+        raise
+
+def test_persisted_queries():
+    """Test sha256-only requests after the query has been registered"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Persisted Queries ===")
+        
+        query = 'query PersistedProducts { allProducts(first: 2) { id title } }'
+        digest = hashlib.sha256(query.encode('utf-8')).hexdigest()
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': digest}}
+        
+        # Unknown hash: the client is told to send the full query
+        response = requests.post(GRAPHQL_URL, json={'extensions': extensions})
+        data = response.json()
+        log_request_response(digest, response, data)
+        assert data['errors'][0]['message'] == 'PersistedQueryNotFound'
+        
+        response = requests.post(GRAPHQL_URL, json={'query': query, 'extensions': extensions})
+        registered = response.json()
+        log_request_response(query, response, registered)
+        assert response.status_code == 200
+        
+        response = requests.post(GRAPHQL_URL, json={'extensions': extensions})
+        data = response.json()
+        log_request_response(digest, response, data)
+        assert response.status_code == 200
+        assert data['data'] == registered['data']
+        
+        # A hash that does not match the query is rejected
+        response = requests.post(GRAPHQL_URL, json={
+            'query': query + ' ',
+            'extensions': extensions
+        })
+        assert response.status_code == 400
+        
+        stats = requests.get(f"{BASE_URL}/stats").json()['document_cache']
+        assert stats['hits'] >= 1
+        print(f"Persisted queries passed ({stats['size']} cached documents)")
+        
+    except Exception as e:
+        print(f"Persisted queries failed: {e}")
+        raise
+
+def test_concurrent_root_fields():
+    """Test a multi-root-field query matches its fields fetched one by one"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Concurrent Root Fields ===")
+        
+        fields = {
+            'cheap': 'allProducts(first: 3, orderBy: PRICE_ASC) { id price }',
+            'count': 'allProductsCount',
+            'page': 'productsConnection(first: 2) { totalCount edges { node { id } } }',
+            'facets': 'catalogFacets { categories { category count } }',
+        }
+        query = 'query { ' + ' '.join(f'{alias}: {field}' for alias, field in fields.items()) + ' }'
+        
+        response = requests.post(GRAPHQL_URL, json={'query': query})
+        data = response.json()
+        log_request_response(query, response, data)
+        assert response.status_code == 200
+        assert 'errors' not in data
+        
+        for alias, field in fields.items():
+            single = requests.post(GRAPHQL_URL, json={'query': f'query {{ {alias}: {field} }}'}).json()
+            assert single['data'][alias] == data['data'][alias], alias
+        
+        print(f"Concurrent root fields passed ({len(fields)} fields)")
+        
+    except Exception as e:
+        print(f"Concurrent root fields failed: {e}")
+        raise
+
+def test_batched_operations(product_id):
+    """Test several operations in one HTTP request come back in order"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Batched Operations ===")
+        
+        batch = [
+            {'query': f'query {{ product(productId: {product_id}) {{ id title }} }}'},
+            {'query': 'query Count { allProductsCount }'},
+            {
+                'query': 'query Page($first: Int) { allProducts(first: $first) { id } }',
+                'variables': {'first': 2}
+            },
+        ]
+        
+        response = requests.post(GRAPHQL_URL, json=batch)
+        data = response.json()
+        log_request_response(json.dumps(batch), response, data)
+        
+        assert response.status_code == 200
+        assert isinstance(data, list) and len(data) == 3
+        assert data[0]['data']['product']['id'] == product_id
+        assert data[1]['data']['allProductsCount'] >= 1
+        assert len(data[2]['data']['allProducts']) == 2
+        
+        # Oversized batches are rejected up front
+        response = requests.post(GRAPHQL_URL, json=[batch[1]] * 1000)
+        assert response.status_code == 400
+        
+        print(f"Batched operations passed ({len(batch)} operations in one request)")
+        
+    except Exception as e:
+        print(f"Batched operations failed: {e}")
+        raise
+
+def test_response_compression():
+    """Test large responses are gzipped and small ones are left alone"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Response Compression ===")
+        
+        query = '''
+        query {
+            allProducts {
+                id
+                title
+                description
+                category
+                image
+                rating
+            }
+        }
+        '''
+        
+        response = requests.post(GRAPHQL_URL, json={'query': query},
+                                 headers={'Accept-Encoding': 'gzip'})
+        data = response.json()
+        log_request_response(query, response, data)
+        assert response.status_code == 200
+        assert len(response.content) >= 1024
+        assert response.headers.get('Content-Encoding') == 'gzip'
+        
+        response = requests.get(f"{BASE_URL}/health", headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+        
+        response = requests.post(GRAPHQL_URL, json={'query': query},
+                                 headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in response.headers
+        assert response.json() == data
+        
+        print("Response compression passed")
+        
+    except Exception as e:
+        print(f"Response compression failed: {e}")
+        raise
+
+def test_catalog_export():
+    """Test the streaming NDJSON and CSV catalog export"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Catalog Export ===")
+        
+        count_query = '{ allProductsCount }'
+        total = requests.post(GRAPHQL_URL, json={'query': count_query}).json()['data']['allProductsCount']
+        
+        response = requests.get(f"{BASE_URL}/export/products", params={'chunk_size': 2}, stream=True)
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('application/x-ndjson')
+        products = [json.loads(line) for line in response.iter_lines() if line]
+        if VERBOSE:
+            print(f"GET {BASE_URL}/export/products -> {len(products)} lines")
+        assert len(products) == total
+        assert [product['id'] for product in products] == sorted(product['id'] for product in products)
+        assert 'rating' in products[0]
+        
+        response = requests.get(f"{BASE_URL}/export/products", params={'format': 'csv'})
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert lines[0].startswith('id,title,price')
+        assert len(lines) == total + 1
+        
+        response = requests.get(f"{BASE_URL}/export/products", params={'format': 'xml'})
+        assert response.status_code == 400
+        
+        response = requests.get(f"{BASE_URL}/export/products", params={'chunk_size': 10 ** 9})
+        assert response.status_code == 400
+        
+        print(f"Catalog export passed ({total} products as NDJSON and CSV)")
+        
+    except Exception as e:
+        print(f"Catalog export failed: {e}")
+        raise
+
 def test_search():
     """Test search functionality with realistic products"""
     try:
@@ -369,6 +1483,71 @@ def test_search():
         print(f"Search failed: {e}")
         raise
 
+def test_full_text_search():
+    """Test the FTS5 index: async title updates are searchable, title hits rank first"""
+    try:
+        if VERBOSE:
+            print("\n=== Testing Full-Text Search ===")
+        
+        create = '''
+        mutation Create($title: String!, $description: String) {
+            createProductSync(title: $title, price: 59.0, description: $description, category: "Coffee") {
+                product {
+                    id
+                }
+            }
+        }
+        '''
+        # Description-only hit created first, so id order alone would list it first
+        ids = []
+        for title, description in (("Plain Burr Mill", "Quietbrew grinder with steel burrs"),
+                                   ("Quietbrew Hand Grinder", "Manual coffee mill")):
+            variables = {'title': title, 'description': description}
+            response = requests.post(GRAPHQL_URL, json={'query': create, 'variables': variables})
+            data = response.json()
+            log_request_response(create, response, data)
+            ids.append(data['data']['createProductSync']['product']['id'])
+        described, titled = ids
+        
+        search = '''
+        query Search($search: String!) {
+            allProducts(search: $search) {
+                id
+                title
+            }
+        }
+        '''
+        def found(text):
+            response = requests.post(GRAPHQL_URL, json={'query': search, 'variables': {'search': text}})
+            data = response.json()
+            log_request_response(search, response, data)
+            assert response.status_code == 200, data
+            return [product['id'] for product in data['data']['allProducts']]
+        
+        # bm25 weighs the title above the description
+        assert found("quietbrew") == [titled, described]
+        
+        # The update trigger re-indexes the title the async writer changes;
+        # terms match in any order and without diacritics
+        mutation = '''
+        mutation Update($id: Int!) {
+            updateProduct(productId: $id, title: "Zéphyrion Burr Mill") {
+                success
+            }
+        }
+        '''
+        response = requests.post(GRAPHQL_URL, json={'query': mutation, 'variables': {'id': int(described)}})
+        assert response.json()['data']['updateProduct']['success'] == True
+        time.sleep(1)
+        assert found("mill zephyrion") == [described]
+        assert found("plain burr") == []
+        
+        print("Full-text search passed (ranked title hit first, async update re-indexed)")
+        
+    except Exception as e:
+        print(f"Full-text search failed: {e}")
+        raise
+
 def test_pagination():
     """Test pagination with full product data"""
     try:
@@ -416,6 +1595,15 @@ def test_pagination():
         skip_products = skip_data['data']['allProducts']
         print(f"  Skip pagination passed ({len(skip_products)} products after skip 2)")
         
+        # Without orderBy the order must not depend on the selected fields
+        orders = []
+        for fields in ('id', 'id price', 'id description'):
+            order_query = f'{{ allProducts(first: 4) {{ {fields} }} }}'
+            order_data = requests.post(GRAPHQL_URL, json={'query': order_query}).json()
+            orders.append([int(product['id']) for product in order_data['data']['allProducts']])
+        assert orders[0] == orders[1] == orders[2] == sorted(orders[0]), orders
+        print(f"  Default order passed (ids {orders[0]} for every selection)")
+        
     except Exception as e:
         print(f"Pagination failed: {e}")
         raise
@@ -449,13 +1637,37 @@ def run_all_tests():
     # Run tests
     try:
         test_health_check()
+        test_write_queue_policies()
+        test_write_queue_counts_rows()
+        test_spill_recovery()
+        test_batch_failure_isolation()
+        test_write_coalescing()
+        test_partial_rating_update()
+        test_id_index_follows_deletes()
+        test_bulk_import()
+        test_catalog_sync()
         test_async_create_product()  #  create with full data
         product_id = test_sync_create_for_testing()  # Sync create with full data
         test_get_all_products()
         test_get_product_by_id(product_id)
+        test_batched_product_lookups(product_id)
+        test_batched_operations(product_id)
         test_async_update_product(product_id)  #  update with full data
+        test_product_cache(product_id)
         test_search()
+        test_full_text_search()
         test_pagination()
+        test_listing_cache()
+        test_persisted_queries()
+        test_concurrent_root_fields()
+        test_response_compression()
+        test_browse_filters()
+        test_catalog_facets()
+        test_cursor_pagination()
+        test_bulk_mutations()
+        test_product_id_index()
+        test_catalog_export()
+        test_stats_endpoint()
         
         print("\n" + "="*50)
         print("All tests passed!")
@@ -0,0 +1,42 @@
+"""
+Request-scoped DataLoaders that batch per-id lookups into one query
+"""
+
+from promise import Promise
+from promise.dataloader import DataLoader
+
+# Keeps each IN (...) list well under SQLite's bound-parameter limit
+MAX_BATCH_SIZE = 500
+
+class ModelLoader(DataLoader):
+    """Collects `load(key)` calls made while a document executes and fetches
+    them with a single `WHERE key IN (...)` query"""
+
+    def __init__(self, model, key: str = 'id', **kwargs):
+        kwargs.setdefault('max_batch_size', MAX_BATCH_SIZE)
+        super(ModelLoader, self).__init__(**kwargs)
+        self.model = model
+        self.key = key
+
+    def batch_load_fn(self, keys):
+        column = getattr(self.model, self.key)
+        rows = self.model.query.filter(column.in_(set(keys))).all()
+        by_key = {getattr(row, self.key): row for row in rows}
+        return Promise.resolve([by_key.get(key) for key in keys])
+
+def get_loader(context, model, key: str = 'id') -> ModelLoader:
+    """Loader for `model` looked up by `key`, shared by every resolver in the request
+
+    Loaders live on the GraphQL context (the Flask request), so their cache
+    never outlives the request that filled it.
+    """
+    loaders = getattr(context, 'dataloaders', None)
+    if loaders is None:
+        loaders = {}
+        context.dataloaders = loaders
+
+    cache_key = (model, key)
+    loader = loaders.get(cache_key)
+    if loader is None:
+        loader = loaders[cache_key] = ModelLoader(model, key)
+    return loader
@@ -0,0 +1,50 @@
+"""
+Idempotent schema migrations, run at startup after create_all
+
+create_all only creates missing tables, so columns and indexes added to a
+model later have to be brought into existing databases here. Every step
+checks the live schema first and is safe to run on each start.
+"""
+
+from sqlalchemy import inspect, text
+
+def add_missing_columns(conn, table) -> list:
+    """ALTER TABLE ADD COLUMN for model columns the database lacks; returns their names"""
+    existing = {column['name'] for column in inspect(conn).get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+        added.append(column.name)
+    return added
+
+def ensure_indexes(conn, table):
+    """Create model indexes missing from an existing table"""
+    for index in table.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+def backfill_rating_columns(conn):
+    """Copy the legacy JSON rating into the indexed rating_rate/rating_count columns"""
+    result = conn.execute(text(
+        """UPDATE products
+           SET rating_rate = json_extract(rating, '$.rate'),
+               rating_count = json_extract(rating, '$.count')
+           WHERE rating IS NOT NULL AND rating_rate IS NULL"""
+    ))
+    return result.rowcount
+
+def run_migrations(engine, metadata):
+    """Bring an existing database up to the current models"""
+    with engine.begin() as conn:
+        products = metadata.tables['products']
+        added = add_missing_columns(conn, products)
+        if added:
+            print(f"Added columns to products: {', '.join(added)}")
+
+        if 'rating_rate' in added and engine.dialect.name == 'sqlite':
+            print(f"Backfilled rating columns for {backfill_rating_columns(conn)} products")
+
+        for table in metadata.sorted_tables:
+            ensure_indexes(conn, table)
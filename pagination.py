@@ -0,0 +1,94 @@
+"""
+Keyset (cursor) pagination for product listings
+
+Pages are fetched with `WHERE (sort_key, id) > (?, ?) ORDER BY sort_key, id
+LIMIT n` against an index on (sort_key, id), so page 1000 costs the same as
+page 1. Cursors are opaque base64 tokens carrying the ordering plus the last
+row's sort value and id.
+
+Rows with a NULL sort key form their own section (first ascending, last
+descending, as SQLite sorts them). An OR across the two sections can't be
+bounded by the index, so each section gets its own range query, and the
+next section is only read when the current one runs out within a page.
+"""
+
+import base64
+import binascii
+import json
+import os
+from typing import Any, List, Optional, Tuple
+from graphql import GraphQLError
+from sqlalchemy import and_, tuple_
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 20))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 100))
+
+def encode_cursor(ordering: str, value: Any, row_id: int) -> str:
+    """Opaque cursor for the row at (value, row_id) under `ordering`"""
+    payload = json.dumps([ordering, value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str, ordering: str) -> Tuple[Any, int]:
+    """Return the (value, row_id) a cursor points at, or raise GraphQLError"""
+    try:
+        cursor_ordering, value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        raise GraphQLError("Invalid cursor")
+
+    if cursor_ordering != ordering or not isinstance(row_id, int):
+        raise GraphQLError("Cursor does not belong to this orderBy")
+    return value, row_id
+
+def keyset_filters(column, id_column, value, row_id: int, descending: bool) -> list:
+    """Predicates for the rows that sort after (value, row_id), one per section
+
+    Each predicate is an index range on (column, id); together, in order,
+    they cover the rest of the ordering.
+    """
+    if column is id_column:
+        return [id_column < row_id if descending else id_column > row_id]
+
+    if value is None:
+        # A row-value comparison against NULL is never true, so walk the
+        # NULL section by id
+        rest = and_(column.is_(None), id_column < row_id if descending else id_column > row_id)
+        return [rest] if descending else [rest, column.isnot(None)]
+
+    if descending:
+        return [tuple_(column, id_column) < tuple_(value, row_id), column.is_(None)]
+    return [tuple_(column, id_column) > tuple_(value, row_id)]
+
+def sort_order(column, id_column, descending: bool) -> list:
+    """ORDER BY terms for a sort key with the id as tie-breaker"""
+    if column is id_column:
+        return [id_column.desc() if descending else id_column.asc()]
+    if descending:
+        return [column.desc(), id_column.desc()]
+    return [column.asc(), id_column.asc()]
+
+def page_size(first: Optional[int]) -> int:
+    """Validate a `first` argument against the page size bounds"""
+    if first is None:
+        return DEFAULT_PAGE_SIZE
+    if first < 1 or first > MAX_PAGE_SIZE:
+        raise GraphQLError(f"first must be between 1 and {MAX_PAGE_SIZE}")
+    return first
+
+def paginate(query, column, id_column, ordering: str, descending: bool,
+             first: Optional[int] = None, after: Optional[str] = None) -> Tuple[List[Any], bool]:
+    """Fetch one page after the `after` cursor; returns (rows, has_next_page)"""
+    limit = page_size(first)
+    query = query.order_by(*sort_order(column, id_column, descending))
+
+    # One extra row tells us whether another page exists
+    if not after:
+        rows = query.limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
+
+    value, row_id = decode_cursor(after, ordering)
+    rows = []
+    for predicate in keyset_filters(column, id_column, value, row_id, descending):
+        rows.extend(query.filter(predicate).limit(limit + 1 - len(rows)).all())
+        if len(rows) > limit:
+            break
+    return rows[:limit], len(rows) > limit
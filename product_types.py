@@ -18,6 +18,9 @@ class ProductType(TypedDict):
     category: Optional[str]
     image: Optional[str]
     rating: Optional[RatingType]
+    rating_rate: Optional[float]
+    rating_count: Optional[int]
+    external_id: Optional[str]
 
 class ProductCreateInput(TypedDict):
     """Type definition for creating a product"""
@@ -44,6 +47,44 @@ class PaginationParams(TypedDict):
     first: Optional[int]
     skip: int
     search: Optional[str]
+    category: Optional[str]
+    min_price: Optional[float]
+    max_price: Optional[float]
+    order_by: Optional[str]
+
+class ConnectionParams(TypedDict):
+    """Type definition for cursor pagination parameters"""
+    first: Optional[int]
+    after: Optional[str]
+    order_by: str
+
+class ProductRecord:
+    """Read-only product row without ORM instrumentation
+
+    Resolves the same GraphQL fields as the Product model, for listing rows
+    and for results served from a cache instead of a session.
+    """
+    __slots__ = ('id', 'title', 'price', 'description', 'category', 'image',
+                 'rating', 'rating_rate', 'rating_count', 'external_id')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_row(cls, names, row) -> 'ProductRecord':
+        """Record from a column-tuple row; fields not in `names` stay None"""
+        record = cls()
+        for name, value in zip(names, row):
+            setattr(record, name, value)
+        return record
+
+    @classmethod
+    def from_model(cls, product) -> 'ProductRecord':
+        return cls(**{name: getattr(product, name) for name in cls.__slots__})
+
+    def to_dict(self) -> ProductType:
+        return {name: getattr(self, name) for name in self.__slots__}
 
 # Type alias for GraphQL response
 GraphQLResponse = Dict[str, Any]
@@ -0,0 +1,56 @@
+"""
+Map a GraphQL selection set onto the columns a resolver has to load
+"""
+
+from typing import Dict, Iterable, Optional, Set, Tuple
+from graphql.language.ast import Field, FragmentSpread, InlineFragment
+from graphene.utils.str_converters import to_camel_case
+
+def _collect(selection_set, fragments, names: Set[str], path: Tuple[str, ...]):
+    """Add the names of fields selected at `path` below `selection_set`"""
+    if selection_set is None:
+        return
+    for selection in selection_set.selections:
+        if isinstance(selection, Field):
+            if not path:
+                names.add(selection.name.value)
+            elif selection.name.value == path[0]:
+                _collect(selection.selection_set, fragments, names, path[1:])
+        elif isinstance(selection, InlineFragment):
+            _collect(selection.selection_set, fragments, names, path)
+        elif isinstance(selection, FragmentSpread):
+            fragment = fragments.get(selection.name.value)
+            if fragment is not None:
+                _collect(fragment.selection_set, fragments, names, path)
+
+def selected_fields(info, path: Tuple[str, ...] = ()) -> Set[str]:
+    """Schema names of the fields selected on the current field's result
+
+    `path` descends through wrapper objects first, e.g. ('edges', 'node') for a
+    connection. Fields under @skip/@include are counted as selected.
+    """
+    names = set()
+    for field_ast in info.field_asts:
+        _collect(field_ast.selection_set, info.fragments, names, path)
+    return names
+
+def column_map(model, extra: Optional[Dict[str, Iterable[str]]] = None) -> Dict[str, Tuple[str, ...]]:
+    """GraphQL field name -> model columns needed to resolve it
+
+    Every mapped column is its own field; `extra` adds computed fields that
+    read one or more columns.
+    """
+    mapping = {
+        to_camel_case(key): (key,) for key in model.__mapper__.column_attrs.keys()
+    }
+    for field, columns in (extra or {}).items():
+        mapping[field] = tuple(columns)
+    return mapping
+
+def requested_columns(info, mapping: Dict[str, Tuple[str, ...]],
+                      path: Tuple[str, ...] = (), always: Iterable[str] = ('id',)) -> Set[str]:
+    """Column names needed for the fields the client selected, plus `always`"""
+    columns = set(always)
+    for field in selected_fields(info, path):
+        columns.update(mapping.get(field, ()))
+    return columns
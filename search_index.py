@@ -0,0 +1,103 @@
+"""
+SQLite FTS5 full-text index over product titles and descriptions
+"""
+
+import re
+from sqlalchemy import MetaData, Table, Column, Integer, Text, func, literal_column, text
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = 'products_fts'
+
+# Kept out of Base.metadata - create_all would build it as an ordinary table
+fts_metadata = MetaData()
+
+products_fts = Table(
+    FTS_TABLE,
+    fts_metadata,
+    Column('rowid', Integer, primary_key=True),
+    Column('title', Text),
+    Column('description', Text),
+)
+
+# External-content table: the index stores only tokens and reads the text
+# back from `products`. The triggers keep it in sync for every writer -
+# the ORM session in app.py and the raw SQL in async_db alike.
+CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            title, description,
+            content='products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON products BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END""",
+]
+
+TRIGGER_NAMES = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+
+# bm25 column weights: a hit in the title counts for more than one in the description
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+def ensure_search_index(engine) -> bool:
+    """Create the FTS5 index and its sync triggers if missing
+
+    Returns False when the database can't host the index (not SQLite, or
+    SQLite built without FTS5) so callers can fall back to LIKE search.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    with engine.begin() as conn:
+        # A bulk import drops the triggers; their absence means the index is stale
+        installed = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+            {'name': TRIGGER_NAMES[0]}
+        ).first()
+        try:
+            for statement in CREATE_STATEMENTS:
+                conn.exec_driver_sql(statement)
+        except OperationalError as e:
+            print(f"Full-text search unavailable, using LIKE search: {e}")
+            return False
+
+        if not installed:
+            # First run against an existing catalog, or after a bulk import -
+            # index what's already there
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+def match_expression(search: str):
+    """Turn free text into an FTS5 query where every term must match as a prefix
+
+    Terms are quoted so user input can't inject FTS5 operators. Returns None
+    when the text has no indexable terms.
+    """
+    terms = re.findall(r'\w+', search)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def apply_search(query, model, search: str):
+    """Restrict an ORM query to FTS matches, best bm25 rank first"""
+    match = match_expression(search)
+    if match is None:
+        return None
+
+    fts = literal_column(FTS_TABLE)
+    return (
+        query.join(products_fts, products_fts.c.rowid == model.id)
+        .filter(fts.op('MATCH')(match))
+        .order_by(func.bm25(fts, TITLE_WEIGHT, DESCRIPTION_WEIGHT))
+    )